@@ -5,36 +5,105 @@
 """
 
 import os
+import sys
+from collections import namedtuple
 from pathlib import Path
+from types import MappingProxyType
 
 # Базовые пути (кроссплатформенные)
 BASE_DIR = Path(__file__).parent.absolute()
 IN_XLSX_DIR = BASE_DIR / "IN_XLSX"
 OUT_XLSX_DIR = BASE_DIR / "OUT_XLSX"
 LOGS_DIR = BASE_DIR / "LOGS"
+CACHE_DIR = BASE_DIR / "CACHE"  # Кэш разобранных исходных файлов (Parquet)
 
-# Создание каталогов если они не существуют
-IN_XLSX_DIR.mkdir(exist_ok=True)
-OUT_XLSX_DIR.mkdir(exist_ok=True)
-LOGS_DIR.mkdir(exist_ok=True)
 
-# Настройки логирования
+def ensure_dirs() -> None:
+    """
+    Создание рабочих каталогов если они не существуют
+    Вызывается явно при запуске, а не при импорте модуля
+    """
+    for directory in (IN_XLSX_DIR, OUT_XLSX_DIR, LOGS_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+
+
+def _freeze_tree(obj):
+    """
+    Рекурсивное интернирование строк (ключей и значений) и заморозка конфигурации
+    Одинаковые заголовки колонок разделяют один объект строки во всех модулях,
+    словари на любом уровне становятся MappingProxyType, списки - кортежами
+    
+    Args:
+        obj: Элемент конфигурации
+        
+    Returns:
+        Неизменяемый элемент с интернированными строками
+    """
+    if isinstance(obj, str):
+        return sys.intern(obj)
+    if isinstance(obj, dict):
+        return MappingProxyType({_freeze_tree(key): _freeze_tree(value) for key, value in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_freeze_tree(item) for item in obj)
+    return obj
+
+
+# Временная метка запуска (общая для файла лога и выходного файла)
 from datetime import datetime
-log_timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+run_timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+
+# Настройки логирования
 LOG_CONFIG = {
     'level': 'DEBUG',  # INFO или DEBUG
-    'file': str(LOGS_DIR / f'comparison_{log_timestamp}.log'),
-    'format': '%(asctime)s - %(levelname)s - %(message)s'
+    'file': str(LOGS_DIR / f'comparison_{run_timestamp}.log'),
+    'format': '%(asctime)s - %(levelname)s - %(message)s',
+    'datefmt': '%Y-%m-%d %H:%M:%S'  # Формат времени без миллисекунд
 }
 
 # Сообщения для логирования удалены - теперь используются прямые тексты в коде
 
+# Соответствие колонок исходных файлов внутренним именам (общее для всех периодов)
+COLUMN_RENAME_MAP = _freeze_tree({
+    'Таб. номер': 'tab_number',
+    'КМ': 'fio',
+    'ТБ': 'tb',
+    'ГОСБ': 'gosb',
+    'ИНН': 'client_id',
+    'Клиент': 'client_name',
+    'ФОТ': 'value'
+})
+
+# Типы исходных колонок, задаются явно, чтобы pandas не определял их по данным:
+# идентификаторы и текстовые поля читаются как строки. Колонка показателя
+# не указывается - в ней встречаются текстовые заглушки ('-', ''),
+# которые обрабатываются при валидации
+SOURCE_DTYPES = _freeze_tree({
+    'Таб. номер': 'str',
+    'КМ': 'str',
+    'ТБ': 'str',
+    'ГОСБ': 'str',
+    'ИНН': 'str',
+    'Клиент': 'str'
+})
+
 # Параметры анализа
 ANALYSIS_CONFIG = {
     
     # Режим расчета прироста
     'growth_calculation_mode': 'report_date',  # 'report_date' или 'deal_date'
     
+    # Тип показателя после валидации
+    # 'float32' вдвое уменьшает объем данных, но хранит только ~7 значащих цифр
+    # (копейки теряются уже для сумм от 100 000), поэтому по умолчанию 'float64'
+    'value_dtype': 'float64',
+    
+    # Параллельная загрузка файлов периодов (по процессу на файл)
+    'parallel_load': True,
+    
+    # Кэширование разобранных файлов в Parquet (CACHE_DIR) для повторных запусков;
+    # кэш сбрасывается при изменении файла или параметров чтения
+    'cache_parsed': True,
+    
     # Правила агрегации данных
     'aggregation_mode': 2,  # 1-3 варианта (используется для клиентов и менеджеров)
     # 1 - по client_id / все клиенты менеджера
@@ -61,43 +130,28 @@ ANALYSIS_CONFIG = {
             'path': str(IN_XLSX_DIR / 'QS ФОТ (30-06-2025).xlsx'),
             'sheet_name': 'Sheet1',
             'use_file': True,  # Использовать файл для анализа
-            'columns': {
-                'Таб. номер': 'tab_number',
-                'КМ': 'fio',
-                'ТБ': 'tb',
-                'ГОСБ': 'gosb',
-                'ИНН': 'client_id',
-                'Клиент': 'client_name',
-                'ФОТ': 'value'
-            }
+            'engine': 'calamine',  # Движок чтения Excel (calamine или openpyxl)
+            'chunk_rows': 5000,  # Размер порции строк при потоковом чтении (openpyxl)
+            'dtypes': SOURCE_DTYPES,
+            'columns': COLUMN_RENAME_MAP
         },
         {
             'path': str(IN_XLSX_DIR / 'QS ФОТ (31-05-2025).xlsx'),
             'sheet_name': 'Sheet1',
             'use_file': True,  # Использовать файл для анализа
-            'columns': {
-                'Таб. номер': 'tab_number',
-                'КМ': 'fio',
-                'ТБ': 'tb',
-                'ГОСБ': 'gosb',
-                'ИНН': 'client_id',
-                'Клиент': 'client_name',
-                'ФОТ': 'value'
-            }
+            'engine': 'calamine',  # Движок чтения Excel (calamine или openpyxl)
+            'chunk_rows': 5000,  # Размер порции строк при потоковом чтении (openpyxl)
+            'dtypes': SOURCE_DTYPES,
+            'columns': COLUMN_RENAME_MAP
         },
         {
             'path': str(IN_XLSX_DIR / 'QS ФОТ (30-04-2025).xlsx'),
             'sheet_name': 'Sheet1',
             'use_file': False,  # Не использовать файл для анализа (T-2 период)
-            'columns': {
-                'Таб. номер': 'tab_number',
-                'КМ': 'fio',
-                'ТБ': 'tb',
-                'ГОСБ': 'gosb',
-                'ИНН': 'client_id',
-                'Клиент': 'client_name',
-                'ФОТ': 'value'
-            }
+            'engine': 'calamine',  # Движок чтения Excel (calamine или openpyxl)
+            'chunk_rows': 5000,  # Размер порции строк при потоковом чтении (openpyxl)
+            'dtypes': SOURCE_DTYPES,
+            'columns': COLUMN_RENAME_MAP
         }
     ],
     
@@ -105,6 +159,10 @@ ANALYSIS_CONFIG = {
     'output': {
         'file_name': str(OUT_XLSX_DIR / 'comparison_result'),
         'add_timestamp': True,  # Добавлять временную метку к имени файла
+        'engine': 'xlsxwriter',  # Движок записи Excel (xlsxwriter или openpyxl)
+        'engine_kwargs': {
+            'options': {'constant_memory': True, 'strings_to_numbers': False}
+        },
         'sheets': {
             'clients': 'Клиенты',
             'managers': 'Клиентские менеджеры',
@@ -206,9 +264,18 @@ ANALYSIS_CONFIG = {
     }
 }
 
+# Итоговое имя выходного файла вычисляется один раз за запуск
+if ANALYSIS_CONFIG['output'].get('add_timestamp', False):
+    ANALYSIS_CONFIG['output']['file_name_resolved'] = f"{ANALYSIS_CONFIG['output']['file_name']}_{run_timestamp}.xlsx"
+else:
+    ANALYSIS_CONFIG['output']['file_name_resolved'] = f"{ANALYSIS_CONFIG['output']['file_name']}.xlsx"
+
 # Настройки для создания тестовых данных
 TEST_DATA_CONFIG = {
     
+    # Генератор случайных чисел (None - новые данные при каждом запуске)
+    'seed': 0xC0FFEE,
+    
     # Параметры клиентов
     'clients_count': 25000,  # Общее количество клиентов
     'clients_new_period_rate': 0.10,  # До 10% новых клиентов в следующем периоде
@@ -461,3 +528,36 @@ CLIENT_NAMES_CONFIG = {
         'Холдинг', 'Концерн', 'Корпорация', 'Ассоциация', 'Союз'
     ]
 }
+
+# Неизменяемые на всех уровнях представления конфигурации (общие для всех модулей, без копирования)
+LOG_CONFIG = _freeze_tree(LOG_CONFIG)
+ANALYSIS_CONFIG = _freeze_tree(ANALYSIS_CONFIG)
+
+# Настройки форматирования по листам
+FORMAT_BY_SHEET = ANALYSIS_CONFIG['output'].get('formatting', MappingProxyType({}))
+
+
+# Описание колонки выходного листа: имя, тип ('number', 'text', 'text_padded')
+# и числовой формат Excel (None для текстовых колонок)
+ColumnSpec = namedtuple('ColumnSpec', 'name kind num_format')
+
+
+def _build_sheet_schemas():
+    """
+    Построение схем листов {лист: (ColumnSpec, ...)} из настроек форматирования
+    """
+    schemas = {}
+    for sheet, column_formats in FORMAT_BY_SHEET.items():
+        schemas[sheet] = tuple(
+            ColumnSpec(
+                column,
+                format_config['type'],
+                format_config.get('format', '#,##0.00') if format_config['type'] == 'number' else None
+            )
+            for column, format_config in column_formats.items()
+        )
+    return MappingProxyType(schemas)
+
+
+# Схемы колонок выходных листов в порядке настроек форматирования
+SHEET_SCHEMAS = _build_sheet_schemas()
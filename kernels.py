@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Ядра numba для агрегаций по группам
+Модуль импортируется только при наличии numba и только при первом использовании,
+чтобы импорт numba и JIT-компиляция не увеличивали время запуска программы
+"""
+
+import numpy as np
+from numba import njit, prange
+
+
+@njit(parallel=True, cache=True)
+def group_sum(codes, values, group_count):
+    """
+    Суммирование строк матрицы values по кодам групп
+    Параллелится по колонкам, чтобы потоки не писали в одну ячейку результата
+    
+    Args:
+        codes: Коды групп для каждой строки (0..group_count-1)
+        values: Матрица суммируемых значений (float64)
+        group_count: Количество групп
+        
+    Returns:
+        Матрица сумм размером group_count x число колонок
+    """
+    result = np.zeros((group_count, values.shape[1]))
+    for column in prange(values.shape[1]):
+        for row in range(values.shape[0]):
+            result[codes[row], column] += values[row, column]
+    return result
@@ -4,88 +4,143 @@
 Обеспечивает запись логов в файл с различными уровнями детализации
 """
 
+import atexit
 import logging
-import os
-from datetime import datetime
-from config import LOG_CONFIG
+import queue
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Tuple
+from config import LOG_CONFIG, ensure_dirs
 
+# Поля потока и процесса не используются в форматах, не заполняем их в каждой записи
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
 
-class Logger:
+
+def setup_logging() -> Tuple[logging.Logger, Optional[QueueListener]]:
     """
-    Класс для управления логированием в программе
-    Поддерживает уровни INFO и DEBUG
+    Настройка обработчиков логирования
+    Формат и уровень берутся из LOG_CONFIG
+    Запись в файл и консоль выполняется фоновым потоком QueueListener,
+    вызывающий поток только помещает запись в очередь
+    
+    Returns:
+        Tuple[logging.Logger, Optional[QueueListener]]: Базовый логгер и запущенный
+        обработчик очереди (None, если логирование уже было настроено)
     """
+    base_logger = logging.getLogger('comparison_logger')
     
-    def __init__(self):
-        """
-        Инициализация логгера
-        Настраивает формат и уровень логирования
-        """
-        self.logger = logging.getLogger('comparison_logger')
-        self.logger.setLevel(getattr(logging, LOG_CONFIG['level']))
-        
-        # Очистка существующих обработчиков
-        self.logger.handlers.clear()
-        
-        # Создание обработчика для записи в файл
-        file_handler = logging.FileHandler(LOG_CONFIG['file'], encoding='utf-8')
-        file_handler.setLevel(getattr(logging, LOG_CONFIG['level']))
-        
-        # Создание обработчика для консоли
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)  # В консоль только INFO и выше
-        
-        # Создание форматтера для файла
-        file_formatter = logging.Formatter(LOG_CONFIG['format'])
-        file_handler.setFormatter(file_formatter)
-        
-        # Создание форматтера для консоли (более простой)
-        console_formatter = logging.Formatter('%(asctime)s - %(message)s')
-        console_handler.setFormatter(console_formatter)
-        
-        # Добавление обработчиков к логгеру
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
-        
-        # Логирование запуска программы
-        self.info("Запуск программы сравнения периодов")
-        self.info("Конфигурация загружена")
+    # Повторный вызов (повторный импорт, дочерний процесс) не добавляет обработчики
+    if base_logger.handlers:
+        return base_logger, None
+    
+    base_logger.setLevel(getattr(logging, LOG_CONFIG['level']))
+    
+    # Каталог логов должен существовать до создания файлового обработчика
+    ensure_dirs()
+    
+    # Создание обработчика для записи в файл
+    # Файл открывается при первой записи: процесс пула (spawn) повторно импортирует
+    # модуль, но пишет только в очередь родителя и пустой файл лога не создает
+    file_handler = logging.FileHandler(LOG_CONFIG['file'], encoding='utf-8', delay=True)
+    file_handler.setLevel(getattr(logging, LOG_CONFIG['level']))
+    
+    # Создание обработчика для консоли
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)  # В консоль только INFO и выше
+    
+    # Создание форматтера для файла
+    file_formatter = logging.Formatter(LOG_CONFIG['format'], datefmt=LOG_CONFIG.get('datefmt'))
+    file_handler.setFormatter(file_formatter)
+    
+    # Создание форматтера для консоли (более простой)
+    console_formatter = logging.Formatter('%(asctime)s - %(message)s', datefmt=LOG_CONFIG.get('datefmt'))
+    console_handler.setFormatter(console_formatter)
+    
+    # Логгер пишет только в очередь, обработчики работают в фоновом потоке
+    log_queue = queue.Queue(-1)
+    base_logger.addHandler(QueueHandler(log_queue))
+    
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
     
-    def info(self, message):
+    return base_logger, listener
+
+
+def redirect_to_queue(log_queue) -> None:
+    """
+    Перенаправление логов дочернего процесса в очередь родительского процесса
+    Используется как initializer пула процессов; записи из очереди пишет
+    родительский процесс (см. ComparisonLogger.forward_worker_logs)
+    
+    Args:
+        log_queue: Очередь multiprocessing, общая с родительским процессом
+    """
+    base_logger = logging.getLogger('comparison_logger')
+    for handler in list(base_logger.handlers):
+        base_logger.removeHandler(handler)
+    base_logger.addHandler(QueueHandler(log_queue))
+
+
+class ComparisonLogger(logging.LoggerAdapter):
+    """
+    Адаптер логгера программы
+    Методы info/debug/error/warning наследуются от LoggerAdapter и
+    форматируют сообщение только если уровень логирования включен
+    (аргументы передаются через %s, а не f-строкой)
+    """
+    
+    def __init__(self, base_logger: logging.Logger, listener: Optional[QueueListener] = None):
         """
-        Запись информационного сообщения в лог
+        Инициализация адаптера
         
         Args:
-            message (str): Сообщение для записи
+            base_logger: Базовый логгер
+            listener: Фоновый обработчик очереди логов
         """
-        self.logger.info(message)
+        super().__init__(base_logger, {})
+        self.listener = listener
     
-    def debug(self, message):
+    def shutdown(self):
         """
-        Запись отладочного сообщения в лог
-        
-        Args:
-            message (str): Сообщение для записи
+        Остановка фонового обработчика с записью оставшихся сообщений
+        Повторный вызов ничего не делает
         """
-        self.logger.debug(message)
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
     
-    def error(self, message):
+    @contextmanager
+    def forward_worker_logs(self, log_queue):
         """
-        Запись сообщения об ошибке в лог
+        Запись логов дочерних процессов из очереди теми же обработчиками,
+        что и логи основного процесса, на время выполнения блока
         
         Args:
-            message (str): Сообщение об ошибке
+            log_queue: Очередь multiprocessing, переданная в redirect_to_queue
         """
-        self.logger.error(message)
+        handlers = self.listener.handlers if self.listener is not None else ()
+        worker_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        worker_listener.start()
+        try:
+            yield
+        finally:
+            worker_listener.stop()
     
-    def warning(self, message):
+    def process(self, msg, kwargs):
         """
-        Запись предупреждения в лог
-        
-        Args:
-            message (str): Сообщение предупреждения
+        Передача сообщения без изменений (контекст адаптера не используется)
+        """
+        return msg, kwargs
+    
+    def startup(self):
+        """
+        Логирование запуска программы
+        Вызывается один раз из точки входа
         """
-        self.logger.warning(message)
+        self.info("Запуск программы сравнения периодов")
+        self.info("Конфигурация загружена")
     
     def log_file_loading(self, file_path):
         """
@@ -94,7 +149,7 @@ class Logger:
         Args:
             file_path (str): Путь к загружаемому файлу
         """
-        self.info(f"Загрузка файла: {file_path}")
+        self.info("Загрузка файла: %s", file_path)
     
     def log_file_loaded(self, file_path):
         """
@@ -103,7 +158,7 @@ class Logger:
         Args:
             file_path (str): Путь к загруженному файлу
         """
-        self.info(f"Файл загружен успешно: {file_path}")
+        self.info("Файл загружен успешно: %s", file_path)
     
     def log_data_processing(self, file_path):
         """
@@ -112,7 +167,7 @@ class Logger:
         Args:
             file_path (str): Путь к обрабатываемому файлу
         """
-        self.debug(f"Обработка данных из файла: {file_path}")
+        self.debug("Обработка данных из файла: %s", file_path)
     
     def log_calculation_start(self):
         """
@@ -133,7 +188,7 @@ class Logger:
         Args:
             file_path (str): Путь к создаваемому файлу
         """
-        self.info(f"Создание выходного файла: {file_path}")
+        self.info("Создание выходного файла: %s", file_path)
     
     def log_output_created(self, file_path):
         """
@@ -142,7 +197,7 @@ class Logger:
         Args:
             file_path (str): Путь к созданному файлу
         """
-        self.info(f"Выходной файл создан: {file_path}")
+        self.info("Выходной файл создан: %s", file_path)
     
     def log_error(self, error_message):
         """
@@ -151,7 +206,7 @@ class Logger:
         Args:
             error_message (str): Сообщение об ошибке
         """
-        self.error(f"Произошла ошибка: {error_message}")
+        self.error("Произошла ошибка: %s", error_message)
     
     def log_program_end(self):
         """
@@ -162,28 +217,28 @@ class Logger:
     # Расширенные методы логирования для загрузки файлов
     def log_file_loading_start(self, filename):
         """Логирование начала загрузки файла"""
-        self.info(f"Начало загрузки файла: {filename}")
-        self.debug(f"Начинаем загрузку файла: {filename}")
+        self.info("Начало загрузки файла: %s", filename)
+        self.debug("Начинаем загрузку файла: %s", filename)
     
     def log_file_load_error(self, filename, error):
         """Логирование ошибки загрузки файла"""
-        self.error(f"Ошибка загрузки файла: {filename}")
-        self.debug(f"Детали ошибки загрузки файла {filename}: {error}")
+        self.error("Ошибка загрузки файла: %s", filename)
+        self.debug("Детали ошибки загрузки файла %s: %s", filename, error)
     
     def log_file_columns_renamed(self, filename, columns):
         """Логирование переименования колонок"""
-        self.info(f"Колонки файла переименованы: {filename}")
-        self.debug(f"Переименованы колонки в файле {filename}: {columns}")
+        self.info("Колонки файла переименованы: %s", filename)
+        self.debug("Переименованы колонки в файле %s: %s", filename, columns)
     
     def log_file_data_cleaned(self, filename, rows_before, rows_after):
         """Логирование очистки данных"""
-        self.info(f"Данные файла очищены от пустых значений: {filename}")
-        self.debug(f"Очистка данных в файле {filename}: было {rows_before} строк, стало {rows_after} строк")
+        self.info("Данные файла очищены от пустых значений: %s", filename)
+        self.debug("Очистка данных в файле %s: было %d строк, стало %d строк", filename, rows_before, rows_after)
     
     def log_file_data_processed(self, filename, rows_count):
         """Логирование обработки данных"""
-        self.info(f"Данные файла обработаны: {filename}")
-        self.debug(f"Обработано {rows_count} строк в файле {filename}")
+        self.info("Данные файла обработаны: %s", filename)
+        self.debug("Обработано %d строк в файле %s", rows_count, filename)
     
     # Методы логирования для анализа данных
     def log_analysis_start(self):
@@ -198,51 +253,54 @@ class Logger:
     
     def log_clients_base_created(self, count):
         """Логирование создания базы клиентов"""
-        self.info(f"База клиентов создана: {count} записей")
-        self.debug(f"Создана база клиентов с {count} уникальными клиентами")
+        self.info("База клиентов создана: %d записей", count)
+        self.debug("Создана база клиентов с %d уникальными клиентами", count)
     
     def log_growth_calculated(self, count):
         """Логирование расчета приростов"""
-        self.info(f"Приросты рассчитаны: {count} записей")
-        self.debug(f"Рассчитаны приросты для {count} записей")
+        self.info("Приросты рассчитаны: %d записей", count)
+        self.debug("Рассчитаны приросты для %d записей", count)
     
     def log_managers_summary_created(self, count):
         """Логирование создания сводки по менеджерам"""
-        self.info(f"Сводка по менеджерам создана: {count} записей")
-        self.debug(f"Создана сводка по {count} менеджерам")
+        self.info("Сводка по менеджерам создана: %d записей", count)
+        self.debug("Создана сводка по %d менеджерам", count)
     
     def log_managers_deal_date_created(self, count):
         """Логирование создания сводки по менеджерам по дате сделки"""
-        self.info(f"Сводка по менеджерам по дате сделки создана: {count} записей")
-        self.debug(f"Создана сводка по {count} менеджерам по дате сделки")
+        self.info("Сводка по менеджерам по дате сделки создана: %d записей", count)
+        self.debug("Создана сводка по %d менеджерам по дате сделки", count)
     
     # Методы логирования для создания выходного файла
     def log_output_creation_start(self, filename):
         """Логирование начала создания выходного файла"""
-        self.info(f"Начало создания выходного файла: {filename}")
-        self.debug(f"Начинаем создание выходного файла: {filename}")
+        self.info("Начало создания выходного файла: %s", filename)
+        self.debug("Начинаем создание выходного файла: %s", filename)
     
     def log_output_formatting_applied(self, filename):
         """Логирование применения форматирования"""
-        self.info(f"Форматирование применено к файлу: {filename}")
-        self.debug(f"Форматирование применено к файлу: {filename}")
+        self.info("Форматирование применено к файлу: %s", filename)
+        self.debug("Форматирование применено к файлу: %s", filename)
     
     # Методы логирования для тестовых данных
     def log_test_files_deleted(self, files):
         """Логирование удаления старых тестовых файлов"""
-        self.info(f"Старые тестовые файлы удалены: {len(files)}")
-        self.debug(f"Удалены старые тестовые файлы: {files}")
+        self.info("Старые тестовые файлы удалены: %d", len(files))
+        self.debug("Удалены старые тестовые файлы: %s", files)
     
     def log_test_files_created(self, files):
         """Логирование создания новых тестовых файлов"""
-        self.info(f"Новые тестовые файлы созданы: {len(files)}")
-        self.debug(f"Созданы новые тестовые файлы: {files}")
+        self.info("Новые тестовые файлы созданы: %d", len(files))
+        self.debug("Созданы новые тестовые файлы: %s", files)
     
     def log_critical_error(self, message):
         """Логирование критической ошибки"""
-        self.error(f"Критическая ошибка: {message}")
-        self.debug(f"Детали критической ошибки: {message}")
+        self.error("Критическая ошибка: %s", message)
+        self.debug("Детали критической ошибки: %s", message)
+
 
+# Создание глобального логгера программы
+logger = ComparisonLogger(*setup_logging())
 
-# Создание глобального экземпляра логгера
-logger = Logger()
+# Запись оставшихся сообщений при завершении интерпретатора
+atexit.register(logger.shutdown)
@@ -4,12 +4,75 @@
 Анализирует Excel файлы и рассчитывает приросты по клиентским менеджерам и клиентам
 """
 
+import hashlib
+import importlib.util
+import logging
+import os
 import pandas as pd
 import numpy as np
+from itertools import islice
+from pandas._libs.parsers import STR_NA_VALUES
 from typing import List, Dict, Tuple, Optional
-from config import ANALYSIS_CONFIG, TEST_DATA_CONFIG, PROGRAM_MODES, IN_XLSX_DIR, TB_GOSB_CODES
-from logger import logger
-from test_data_generator import create_test_data
+from types import MappingProxyType
+from config import (ensure_dirs, ANALYSIS_CONFIG, TEST_DATA_CONFIG, PROGRAM_MODES, IN_XLSX_DIR, CACHE_DIR, TB_GOSB_CODES,
+                    FORMAT_BY_SHEET, COLUMN_RENAME_MAP, SOURCE_DTYPES, SHEET_SCHEMAS)
+from logger import logger, redirect_to_queue
+from test_data_generator import TestDataGenerator, create_test_data
+
+# Версия формата кэша разобранных файлов: меняется при изменении типов колонок загруженных данных
+CACHE_FORMAT_VERSION = 2
+
+
+def _make_formatter(format_config):
+    """
+    Построение функции подготовки колонки к записи по настройке форматирования
+    Функция применяется к целой колонке DataFrame (векторно), а не к каждой ячейке
+    
+    Args:
+        format_config: Настройка форматирования колонки
+        
+    Returns:
+        callable или None: Функция преобразования pd.Series или None, если
+        значения записываются как есть (формат задается стилем ячейки)
+    """
+    if format_config['type'] != 'text_padded':
+        return None
+    
+    pad_length = int(format_config.get('format', '8'))
+    
+    def pad_column(series):
+        # Целые значения во float-колонке (после слияния с пропусками) пишем без ".0"
+        if series.dtype.kind == 'f':
+            values = series.dropna()
+            if (values == values.round()).all():
+                series = series.astype('Int64')
+        # Целые числа без пропусков (табельные номера) дополняются нулями одним вызовом NumPy
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'iu':
+            padded = np.char.zfill(series.to_numpy().astype(str), pad_length)
+            return pd.Series(padded, index=series.index, dtype='string')
+        return series.astype('string').str.zfill(pad_length)
+    
+    return pad_column
+
+
+def _compile_formatters():
+    """
+    Построение таблицы функций форматирования {лист: {колонка: функция}}
+    Колонки без преобразования значений в таблицу не попадают
+    """
+    compiled = {}
+    for sheet, column_formats in FORMAT_BY_SHEET.items():
+        sheet_formatters = {}
+        for column, format_config in column_formats.items():
+            formatter = _make_formatter(format_config)
+            if formatter is not None:
+                sheet_formatters[column] = formatter
+        compiled[sheet] = MappingProxyType(sheet_formatters)
+    return MappingProxyType(compiled)
+
+
+# Предкомпилированные функции форматирования по листам и колонкам
+COMPILED_FORMATTERS = _compile_formatters()
 
 
 class PeriodComparison:
@@ -31,6 +94,7 @@ class PeriodComparison:
         self.program_mode = PROGRAM_MODES['mode']
         self.aggregation_mode = self.config.get('aggregation_mode', 1)
         self.field_mapping = self.config.get('field_mapping', {})
+        self.value_dtype = self.config.get('value_dtype', 'float64')
         self.tb_gosb_codes = TB_GOSB_CODES
         
         # Словари для хранения данных из каждого файла
@@ -38,7 +102,7 @@ class PeriodComparison:
         self.clients_data = {}
         self.managers_data = {}
         
-        logger.debug(f"Инициализация с количеством файлов: {self.file_count}")
+        logger.debug("Инициализация с количеством файлов: %s", self.file_count)
     
     def _get_files_for_mode(self):
         """
@@ -49,14 +113,12 @@ class PeriodComparison:
         """
         if self.program_mode in [2, 4]:  # Режимы работы с тестовыми данными
             # Используем тестовые файлы, генерируем имена на основе обычных файлов
-            from config import ANALYSIS_CONFIG
             used_files = [file_config for file_config in ANALYSIS_CONFIG['files'] if file_config.get('use_file', True)]
             files_to_use = []
             
             for i in range(self.file_count):
                 if i < len(used_files):
                     # Генерируем имя тестового файла на основе обычного файла
-                    import os
                     original_path = used_files[i]['path']
                     original_filename = os.path.basename(original_path)
                     test_filename = f"test_{original_filename}"
@@ -64,30 +126,20 @@ class PeriodComparison:
                     file_config = {
                         'path': str(IN_XLSX_DIR / test_filename),
                         'sheet_name': 'Sheet1',
-                        'columns': {
-                            'Таб. номер': 'tab_number',
-                            'КМ': 'fio',
-                            'ТБ': 'tb',
-                            'ГОСБ': 'gosb',
-                            'ИНН': 'client_id',
-                            'Клиент': 'client_name',
-                            'ФОТ': 'value'
-                        }
+                        'engine': used_files[i].get('engine', 'calamine'),
+                        'chunk_rows': used_files[i].get('chunk_rows', 5000),
+                        'dtypes': used_files[i].get('dtypes', SOURCE_DTYPES),
+                        'columns': COLUMN_RENAME_MAP
                     }
                 else:
                     # Если файлов больше, чем в конфигурации, используем имя по умолчанию
                     file_config = {
                         'path': str(IN_XLSX_DIR / f'test_data_period{i+1}.xlsx'),
                         'sheet_name': 'Sheet1',
-                        'columns': {
-                            'Таб. номер': 'tab_number',
-                            'КМ': 'fio',
-                            'ТБ': 'tb',
-                            'ГОСБ': 'gosb',
-                            'ИНН': 'client_id',
-                            'Клиент': 'client_name',
-                            'ФОТ': 'value'
-                        }
+                        'engine': 'calamine',
+                        'chunk_rows': 5000,
+                        'dtypes': SOURCE_DTYPES,
+                        'columns': COLUMN_RENAME_MAP
                     }
                 files_to_use.append(file_config)
             
@@ -114,11 +166,11 @@ class PeriodComparison:
             
             # Проверяем на специальные случаи
             if str_value.lower() in ['grey_zone', 'grey zone', 'greyzone']:
-                logger.debug(f"Найдено значение 'grey_zone' в табельном номере, заменяем на 90000000")
+                logger.debug("Найдено значение 'grey_zone' в табельном номере, заменяем на 90000000")
                 return 90000000
             
             if str_value in ['-', '', 'nan', 'None', 'null']:
-                logger.debug(f"Найдено пустое или некорректное значение в табельном номере, заменяем на 70000000")
+                logger.debug("Найдено пустое или некорректное значение в табельном номере, заменяем на 70000000")
                 return 70000000
             
             # Пытаемся преобразовать в число
@@ -130,44 +182,37 @@ class PeriodComparison:
                 tab_number = int(numeric_value)
                 # Проверяем, что номер не превышает 8 знаков
                 if tab_number > 99999999:
-                    logger.debug(f"Табельный номер {value} превышает 8 знаков, заменяем на 70000000")
+                    logger.debug("Табельный номер %s превышает 8 знаков, заменяем на 70000000", value)
                     return 70000000
                 return tab_number
             else:
-                logger.debug(f"Табельный номер {value} не является положительным целым числом, заменяем на 70000000")
+                logger.debug("Табельный номер %s не является положительным целым числом, заменяем на 70000000", value)
                 return 70000000
                 
         except (ValueError, TypeError):
-            logger.debug(f"Не удалось преобразовать табельный номер '{value}' в число, заменяем на 70000000")
+            logger.debug("Не удалось преобразовать табельный номер '%s' в число, заменяем на 70000000", value)
             return 70000000
     
-    def _is_excluded_tab_number(self, tab_number: int) -> bool:
+    def _excluded_tab_numbers_mask(self, tab_numbers: np.ndarray) -> np.ndarray:
         """
-        Проверяет, является ли табельный номер исключенным (8XXYYYYY или 9XXYYYYY)
+        Маска исключенных табельных номеров (8XXYYYYY или 9XXYYYYY)
         
         Args:
-            tab_number: Табельный номер для проверки
+            tab_numbers (np.ndarray): Табельные номера
             
         Returns:
-            bool: True если табельный номер должен быть исключен
+            np.ndarray: Маска исключенных табельных номеров (8XXYYYYY или 9XXYYYYY, кроме 90000000)
         """
-        if tab_number == 0 or tab_number == 90000000:
-            return False
-        
-        # Преобразуем в строку для проверки
-        tab_str = str(tab_number).zfill(8)
-        
-        # Проверяем на паттерны 8XXYYYYY и 9XXYYYYY
-        if len(tab_str) == 8:
-            if tab_str[0] in ['8', '9']:
-                return True
-        
-        return False
+        # 8-значные номера с первой цифрой 8 или 9 - это диапазон 80000000..99999999
+        # (номер серой зоны 90000000 не исключается)
+        return (tab_numbers >= 80000000) & (tab_numbers <= 99999999) & (tab_numbers != 90000000)
     
     def _validate_value(self, value) -> float:
         """
         Валидация и очистка показателя
         Заменяет нечисловые и пустые значения на 0
+        Вызывается из _validate_values только для значений, которые не разобрал
+        pd.to_numeric (числа туда не попадают)
         
         Args:
             value: Значение для валидации
@@ -178,14 +223,14 @@ class PeriodComparison:
         try:
             # Проверяем на пустые значения
             if pd.isna(value) or value is None:
-                logger.debug(f"Найдено пустое значение в показателе, заменяем на 0")
+                logger.debug("Найдено пустое значение в показателе, заменяем на 0")
                 return 0.0
             
             # Преобразуем в строку и очищаем
             str_value = str(value).strip()
             
             if str_value in ['', '-', 'nan', 'None', 'null']:
-                logger.debug(f"Найдено некорректное значение в показателе, заменяем на 0")
+                logger.debug("Найдено некорректное значение в показателе, заменяем на 0")
                 return 0.0
             
             # Пытаемся преобразовать в число
@@ -193,23 +238,219 @@ class PeriodComparison:
             
             # Проверяем на бесконечность и NaN
             if pd.isna(numeric_value) or not np.isfinite(numeric_value):
-                logger.debug(f"Показатель {value} содержит NaN или бесконечность, заменяем на 0")
+                logger.debug("Показатель %s содержит NaN или бесконечность, заменяем на 0", value)
                 return 0.0
             
             return numeric_value
             
         except (ValueError, TypeError):
-            logger.debug(f"Не удалось преобразовать показатель '{value}' в число, заменяем на 0")
+            logger.debug("Не удалось преобразовать показатель '%s' в число, заменяем на 0", value)
             return 0.0
 
-    def load_excel_file(self, file_path: str, sheet_name: str, columns: Dict[str, str]) -> pd.DataFrame:
+    def _validate_tab_numbers(self, tab_numbers: pd.Series) -> pd.Series:
+        """
+        Векторная валидация колонки табельных номеров
+        Результат совпадает с поэлементным применением _validate_tab_number:
+        типовые значения разбираются одним проходом pd.to_numeric, а к редким
+        нестандартным строкам применяется _validate_tab_number
+        
+        Args:
+            tab_numbers (pd.Series): Исходные табельные номера
+            
+        Returns:
+            pd.Series: Валидные табельные номера (int64)
+        """
+        text = tab_numbers.astype(str).str.strip().str.replace("'", "")
+        numeric = pd.to_numeric(text, errors='coerce').astype('float64').to_numpy()
+        
+        with np.errstate(invalid='ignore'):
+            is_valid = (np.mod(numeric, 1) == 0) & (numeric >= 0) & (numeric <= 99999999)
+        result = np.where(is_valid, np.nan_to_num(numeric), 70000000).astype(np.int64)
+        
+        # Специальные значения проверяются только среди строк, которые не разобрал pd.to_numeric
+        unparsed = np.flatnonzero(np.isnan(numeric))
+        if len(unparsed):
+            unparsed_text = text.iloc[unparsed]
+            is_grey = unparsed_text.str.lower().isin(['grey_zone', 'grey zone', 'greyzone']).to_numpy()
+            is_empty = unparsed_text.isin(['-', '', 'nan', 'None', 'null']).to_numpy()
+            result[unparsed[is_grey]] = 90000000
+            
+            # Строки, которые не разобрал pd.to_numeric, но может разобрать float()
+            residue = unparsed[unparsed_text.notna().to_numpy() & ~is_grey & ~is_empty]
+            if len(residue):
+                result[residue] = [self._validate_tab_number(value) for value in tab_numbers.iloc[residue]]
+        
+        return pd.Series(result, index=tab_numbers.index)
+    
+    def _validate_values(self, values: pd.Series) -> pd.Series:
+        """
+        Векторная валидация колонки показателей
+        Результат совпадает с поэлементным применением _validate_value
+        
+        Args:
+            values (pd.Series): Исходные показатели
+            
+        Returns:
+            pd.Series: Валидные показатели (float64)
+        """
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            numeric = values.astype('float64').to_numpy(copy=True)
+            residue = np.zeros(len(numeric), dtype=bool)
+        else:
+            text = values.astype(str).str.strip()
+            numeric = pd.to_numeric(text, errors='coerce').astype('float64').to_numpy(copy=True)
+            is_empty = text.isin(['', '-', 'nan', 'None', 'null']).to_numpy()
+            residue = np.isnan(numeric) & text.notna().to_numpy() & ~is_empty
+        
+        numeric[~np.isfinite(numeric)] = 0.0
+        if residue.any():
+            numeric[residue] = [self._validate_value(value) for value in values[residue]]
+        
+        return pd.Series(numeric, index=values.index)
+
+    def _count_empty_markers(self, values: pd.Series) -> int:
+        """
+        Количество пустых значений и строк-заглушек ('', '-', 'nan', 'None', 'null') в колонке
+        Для числовой колонки строк быть не может, поэтому считаются только пропуски
+        
+        Args:
+            values (pd.Series): Исходные значения колонки
+            
+        Returns:
+            int: Количество некорректных значений
+        """
+        missing = int(values.isna().sum())
+        if pd.api.types.is_numeric_dtype(values):
+            return missing
+        return missing + int(values.astype(str).str.strip().isin(['', '-', 'nan', 'None', 'null']).sum())
+
+    def _normalize_client_ids(self, client_ids: pd.Series) -> pd.Series:
+        """
+        Очистка ID клиентов от апострофов и дополнение нулями до 20 знаков
+        При наличии pyarrow обе операции выполняются ядрами pyarrow.compute
+        
+        Args:
+            client_ids (pd.Series): Исходные ID клиентов
+            
+        Returns:
+            pd.Series: Нормализованные ID клиентов
+        """
+        text = client_ids.astype(str)
+        if importlib.util.find_spec('pyarrow') is None:
+            return text.str.replace("'", "").str.zfill(20)
+        
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        
+        ids = pc.replace_substring(pa.array(text, type=pa.string(), from_pandas=True), pattern="'", replacement="")
+        result = pc.utf8_lpad(ids, width=20, padding='0').to_pandas().astype('str').set_axis(text.index)
+        
+        # str.zfill ставит нули после знака, а utf8_lpad перед ним: такие ID дополняются через pandas
+        signed = pc.fill_null(pc.or_(pc.starts_with(ids, '-'), pc.starts_with(ids, '+')), False)
+        signed = signed.to_numpy(zero_copy_only=False)
+        if signed.any():
+            result[signed] = text[signed].str.replace("'", "").str.zfill(20)
+        return result
+
+    def _get_excel_engine(self, engine: str) -> str:
+        """
+        Определение движка чтения Excel файлов
+        Если calamine недоступен, используется openpyxl
+        
+        Args:
+            engine: Движок из конфигурации файла
+            
+        Returns:
+            str: Доступный движок для pd.read_excel
+        """
+        if engine == 'calamine':
+            if importlib.util.find_spec('python_calamine') is None:
+                logger.debug("Модуль python_calamine не найден, используем движок openpyxl")
+                return 'openpyxl'
+        return engine
+    
+    def _read_excel_streaming(self, file_path: str, sheet_name: str, columns: Dict[str, str],
+                              dtypes: Optional[Dict[str, str]], chunk_rows: int) -> pd.DataFrame:
+        """
+        Потоковое чтение листа Excel через openpyxl в режиме read_only
+        Строки читаются порциями по chunk_rows, в память попадают только нужные колонки
+        
+        Args:
+            file_path (str): Путь к Excel файлу
+            sheet_name (str): Название листа
+            columns (Dict[str, str]): Словарь соответствия колонок
+            dtypes (Dict[str, str], optional): Типы исходных колонок
+            chunk_rows (int): Размер порции строк
+            
+        Returns:
+            pd.DataFrame: Загруженные данные с исходными названиями колонок
+        """
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            header = next(rows, ())
+            positions = [i for i, name in enumerate(header) if name in columns]
+            names = [header[i] for i in positions]
+            
+            # Значения накапливаются сразу по колонкам, DataFrame строится один раз
+            column_values = [[] for _ in positions]
+            while True:
+                batch = [
+                    [row[i] if i < len(row) else None for i in positions]
+                    for row in islice(rows, chunk_rows)
+                ]
+                if not batch:
+                    break
+                for values, chunk_column in zip(column_values, zip(*batch)):
+                    values.extend(chunk_column)
+                logger.debug("Прочитана порция из %s строк", len(batch))
+        finally:
+            workbook.close()
+        
+        # Пустые ячейки и строки-пропуски ('', 'nan', 'NULL', 'N/A', ...) заменяются на NaN,
+        # как в pd.read_excel
+        data = {}
+        for name, values in zip(names, column_values):
+            values = pd.Series(values, dtype=object)
+            values[values.isna() | values.isin(STR_NA_VALUES)] = np.nan
+            data[name] = values
+        df = pd.DataFrame(data, columns=names)
+        # Пустые строки в конце листа отбрасываются, пустые строки внутри данных
+        # остаются (как в pd.read_excel) и удаляются при очистке вместе с прочими пропусками
+        filled = np.flatnonzero(df.notna().any(axis=1).to_numpy())
+        df = df.iloc[:filled[-1] + 1 if len(filled) else 0]
+        
+        # Приведение типов только для заполненных значений, как это делает pd.read_excel:
+        # целые числа, которые openpyxl возвращает как float, приводятся к int (без ".0")
+        for column, dtype in (dtypes or {}).items():
+            if column in df.columns:
+                values = df[column].dropna()
+                numbers = pd.to_numeric(values[values.map(type).eq(float)])
+                integral = numbers[np.isfinite(numbers) & (numbers == np.floor(numbers))]
+                in_range = integral.abs() < 2 ** 63
+                values[integral.index[in_range]] = integral[in_range].astype(np.int64)
+                if not in_range.all():
+                    values[integral.index[~in_range]] = [int(v) for v in integral[~in_range]]
+                df[column] = values.astype(dtype).reindex(df.index)
+        # Колонки без заданного типа (показатель) получают тип по данным, как в pd.read_excel
+        return df.infer_objects()
+    
+    def load_excel_file(self, file_path: str, sheet_name: str, columns: Dict[str, str],
+                        engine: str = 'calamine', dtypes: Optional[Dict[str, str]] = None,
+                        chunk_rows: int = 5000) -> pd.DataFrame:
         """
         Загрузка данных из Excel файла
+        Читаются только колонки, указанные в конфигурации
         
         Args:
             file_path (str): Путь к Excel файлу
             sheet_name (str): Название листа
             columns (Dict[str, str]): Словарь соответствия колонок
+            engine (str): Движок чтения Excel (calamine или openpyxl)
+            dtypes (Dict[str, str], optional): Типы исходных колонок
+            chunk_rows (int): Размер порции строк при потоковом чтении через openpyxl
             
         Returns:
             pd.DataFrame: Загруженные данные
@@ -220,22 +461,43 @@ class PeriodComparison:
         """
         try:
             logger.log_file_loading_start(file_path)
-            logger.debug(f"Загружаем лист: {sheet_name}")
+            logger.debug("Загружаем лист: %s", sheet_name)
+            
+            # Повторный запуск на тех же файлах читает готовый результат из кэша
+            cache_path = self._get_cache_path(file_path, sheet_name, columns, dtypes)
+            if cache_path is not None and cache_path.exists():
+                df = pd.read_parquet(cache_path)
+                logger.debug("Данные прочитаны из кэша: %s", cache_path)
+                logger.log_file_loaded(file_path)
+                logger.log_file_data_processed(file_path, len(df))
+                return df
             
             # Загрузка данных из Excel файла
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
-            logger.debug(f"Исходный файл содержит {len(df)} строк и {len(df.columns)} колонок")
+            engine = self._get_excel_engine(engine)
+            logger.debug("Движок чтения Excel: %s", engine)
+            if engine == 'openpyxl':
+                df = self._read_excel_streaming(file_path, sheet_name, columns, dtypes, chunk_rows)
+            else:
+                df = pd.read_excel(
+                    file_path,
+                    sheet_name=sheet_name,
+                    engine=engine,
+                    usecols=lambda column_name: column_name in columns,
+                    # pandas копирует словарь типов через deepcopy, MappingProxyType так не копируется
+                    dtype=dict(dtypes) if dtypes else None
+                )
+            logger.debug("Исходный файл содержит %s строк и %s колонок", len(df), len(df.columns))
             
             # Переименование колонок согласно конфигурации
             df = df.rename(columns=columns)
             logger.log_file_columns_renamed(file_path, list(columns.keys()))
-            logger.debug(f"Колонки переименованы: {columns}")
+            logger.debug("Колонки переименованы: %s", columns)
             
             # Очистка данных от пустых значений (после переименования)
             rows_before = len(df)
             required_columns = ['client_id', 'value']
             available_columns = [col for col in required_columns if col in df.columns]
-            logger.debug(f"Доступные колонки для очистки: {available_columns}")
+            logger.debug("Доступные колонки для очистки: %s", available_columns)
             if available_columns:
                 df = df.dropna(subset=available_columns)
                 logger.log_file_data_cleaned(file_path, rows_before, len(df))
@@ -249,39 +511,50 @@ class PeriodComparison:
             if 'tab_number' in df.columns:
                 logger.debug("Валидация табельных номеров")
                 original_tab_count = len(df)
-                original_invalid_tab = df['tab_number'].isna().sum() + (df['tab_number'].astype(str).str.strip().isin(['', '-', 'nan', 'None', 'null'])).sum()
+                original_invalid_tab = self._count_empty_markers(df['tab_number'])
                 
                 # Применяем валидацию к табельным номерам
-                df['tab_number'] = df['tab_number'].apply(self._validate_tab_number)
-                
-                # Обработка табельных номеров с апострофами (после валидации)
-                df['tab_number'] = df['tab_number'].astype(str).str.replace("'", "").str.zfill(8)
+                # Номера (не длиннее 8 цифр) хранятся числами, до 8 знаков они дополняются только при записи
+                df['tab_number'] = self._validate_tab_numbers(df['tab_number']).astype(np.int32)
                 
-                logger.debug(f"Валидация табельных номеров завершена: {df['tab_number'].nunique()} уникальных")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Валидация табельных номеров завершена: %s уникальных", df['tab_number'].nunique())
                 if original_invalid_tab > 0:
-                    logger.info(f"Заменено {original_invalid_tab} некорректных табельных номеров на 70000000 и 90000000")
+                    logger.info("Заменено %s некорректных табельных номеров на 70000000 и 90000000", original_invalid_tab)
             
             # Валидация ID клиентов
             if 'client_id' in df.columns:
                 logger.debug("Обработка ID клиентов")
                 # Обработка ID клиентов с апострофами
-                df['client_id'] = df['client_id'].astype(str).str.replace("'", "").str.zfill(20)
-                logger.debug(f"Обработаны ID клиентов: {df['client_id'].nunique()} уникальных")
+                df['client_id'] = self._normalize_client_ids(df['client_id'])
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Обработаны ID клиентов: %s уникальных", df['client_id'].nunique())
             
             # Валидация показателей
             if 'value' in df.columns:
                 logger.debug("Валидация показателей")
-                original_invalid_values = df['value'].isna().sum() + (df['value'].astype(str).str.strip().isin(['', '-', 'nan', 'None', 'null'])).sum()
+                original_invalid_values = self._count_empty_markers(df['value'])
                 
                 # Применяем валидацию к показателям
-                df['value'] = df['value'].apply(self._validate_value)
+                df['value'] = self._validate_values(df['value']).astype(self.value_dtype)
                 
-                logger.debug(f"Валидация показателей завершена: среднее = {df['value'].mean():.2f}, сумма = {df['value'].sum():.2f}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    # Статистика считается в float64 независимо от типа показателя
+                    values = df['value'].astype('float64')
+                    logger.debug("Валидация показателей завершена: среднее = %.2f, сумма = %.2f", values.mean(), values.sum())
                 if original_invalid_values > 0:
-                    logger.info(f"Заменено {original_invalid_values} некорректных показателей на 0")
+                    logger.info("Заменено %s некорректных показателей на 0", original_invalid_values)
             
             logger.debug("Валидация и очистка данных завершена")
             
+            # Строковые колонки хранятся как категории: повторяющиеся значения кодируются целыми числами
+            for column in ('client_id', 'fio', 'tb', 'gosb', 'client_name'):
+                if column in df.columns:
+                    df[column] = df[column].astype('category')
+            
+            if cache_path is not None:
+                self._write_cache(df, cache_path)
+            
             logger.log_file_loaded(file_path)
             logger.log_file_data_processed(file_path, len(df))
             
@@ -296,6 +569,68 @@ class PeriodComparison:
             logger.log_error(error_msg)
             raise Exception(error_msg)
     
+    def _get_cache_path(self, file_path: str, sheet_name: str, columns: Dict[str, str],
+                        dtypes: Optional[Dict[str, str]]):
+        """
+        Путь к файлу кэша для исходного файла
+        Имя файла кэша состоит из хэша пути и листа (по нему удаляются устаревшие
+        записи того же файла) и хэша ключа: времени изменения и размера файла,
+        а также параметров чтения, влияющих на результат
+        
+        Args:
+            file_path (str): Путь к Excel файлу
+            sheet_name (str): Название листа
+            columns (Dict[str, str]): Словарь соответствия колонок
+            dtypes (Dict[str, str], optional): Типы исходных колонок
+            
+        Returns:
+            Path: Путь к файлу кэша или None, если кэширование недоступно
+        """
+        if not self.config.get('cache_parsed', True) or importlib.util.find_spec('pyarrow') is None:
+            return None
+        # В режиме 4 тестовые файлы создаются заново при каждом запуске, их кэш не будет прочитан
+        if self.program_mode == 4:
+            return None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        source_key = repr((os.path.abspath(file_path), sheet_name))
+        key_source = repr((
+            CACHE_FORMAT_VERSION, stat.st_mtime_ns, stat.st_size,
+            sorted(columns.items()), sorted((dtypes or {}).items()), self.value_dtype
+        ))
+        source_hash = hashlib.sha1(source_key.encode('utf-8')).hexdigest()
+        key_hash = hashlib.sha1(key_source.encode('utf-8')).hexdigest()
+        return CACHE_DIR / f"{source_hash}_{key_hash}.parquet"
+    
+    def _write_cache(self, df: pd.DataFrame, cache_path) -> None:
+        """
+        Сохранение загруженных данных в кэш
+        Прежние записи кэша того же файла и листа удаляются
+        Ошибка записи кэша не прерывает работу программы
+        
+        Args:
+            df (pd.DataFrame): Загруженные и очищенные данные
+            cache_path: Путь к файлу кэша
+        """
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Запись во временный файл и переименование: параллельные процессы
+            # не увидят частично записанный кэш
+            temp_path = cache_path.with_name(f"{cache_path.stem}.{os.getpid()}.tmp")
+            df.to_parquet(temp_path, compression='snappy')
+            os.replace(temp_path, cache_path)
+            logger.debug("Данные сохранены в кэш: %s", cache_path)
+            
+            source_hash = cache_path.stem.split('_')[0]
+            for stale_path in CACHE_DIR.glob(f"{source_hash}_*.parquet"):
+                if stale_path != cache_path:
+                    stale_path.unlink(missing_ok=True)
+                    logger.debug("Удален устаревший кэш: %s", stale_path)
+        except Exception as e:
+            logger.debug("Не удалось сохранить кэш %s: %s", cache_path, e)
+    
     def load_all_files(self) -> None:
         """
         Загрузка всех файлов согласно конфигурации
@@ -306,20 +641,74 @@ class PeriodComparison:
         # Получаем файлы в зависимости от режима работы
         files_to_load = self._get_files_for_mode()
         
+        # Файлы независимы, при нескольких файлах и ядрах они разбираются в отдельных процессах
+        if self.config.get('parallel_load', True) and min(len(files_to_load), os.cpu_count() or 1) > 1:
+            self._load_files_parallel(files_to_load)
+            return
+        
         for i, file_config in enumerate(files_to_load):
             try:
-                df = self.load_excel_file(
-                    file_config['path'],
-                    file_config['sheet_name'],
-                    file_config['columns']
-                )
+                df = self.load_excel_file(*self._get_load_args(file_config))
                 self.data_frames[f'period_{i+1}'] = df
-                logger.debug(f"Файл периода {i+1} загружен успешно")
+                logger.debug("Файл периода %s загружен успешно", i + 1)
                 
             except Exception as e:
                 logger.log_error(f"Ошибка загрузки файла периода {i+1}: {str(e)}")
                 raise
     
+    def _get_load_args(self, file_config: dict) -> tuple:
+        """
+        Аргументы load_excel_file для файла из конфигурации
+        Замороженные словари конфигурации (MappingProxyType) не сериализуются pickle,
+        поэтому копируются, чтобы аргументы можно было передать в другой процесс
+        
+        Args:
+            file_config (dict): Конфигурация файла
+            
+        Returns:
+            tuple: Аргументы load_excel_file
+        """
+        dtypes = file_config.get('dtypes')
+        return (
+            file_config['path'],
+            file_config['sheet_name'],
+            dict(file_config['columns']),
+            file_config.get('engine', 'calamine'),
+            dict(dtypes) if dtypes else None,
+            file_config.get('chunk_rows', 5000)
+        )
+    
+    def _load_files_parallel(self, files_to_load: list) -> None:
+        """
+        Параллельная загрузка файлов в пуле процессов (по процессу на файл)
+        Логи дочерних процессов пишутся основным процессом через очередь
+        
+        Args:
+            files_to_load (list): Конфигурации загружаемых файлов
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        
+        context = multiprocessing.get_context()
+        log_queue = context.Queue()
+        workers = min(len(files_to_load), os.cpu_count() or 1)
+        logger.debug("Параллельная загрузка %s файлов, процессов: %s", len(files_to_load), workers)
+        
+        with logger.forward_worker_logs(log_queue):
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=redirect_to_queue, initargs=(log_queue,)) as executor:
+                futures = [
+                    executor.submit(_load_excel_file_worker, *self._get_load_args(file_config))
+                    for file_config in files_to_load
+                ]
+                for i, future in enumerate(futures):
+                    try:
+                        self.data_frames[f'period_{i+1}'] = future.result()
+                        logger.debug("Файл периода %s загружен успешно", i + 1)
+                    except Exception as e:
+                        logger.log_error(f"Ошибка загрузки файла периода {i+1}: {str(e)}")
+                        raise
+    
     def create_clients_base(self) -> pd.DataFrame:
         """
         Создание базы клиентов из уникальных идентификаторов
@@ -331,157 +720,110 @@ class PeriodComparison:
         logger.debug("Создание базы клиентов")
         
         # Сбор всех уникальных ключей агрегации клиентов
-        all_client_keys = set()
-        for period_key, df in self.data_frames.items():
-            for _, row in df.iterrows():
-                client_key = self._get_client_aggregation_key(row)
-                all_client_keys.add(client_key)
+        all_client_keys = pd.Index(np.concatenate([
+            self._get_client_aggregation_keys(df).to_numpy(dtype=object) for df in self.data_frames.values()
+        ])).unique()
         
         # Создание базового DataFrame с клиентами
-        clients_base = pd.DataFrame({'client_key': list(all_client_keys)})
+        clients_base = pd.DataFrame({'client_key': all_client_keys})
         
-        # Добавление данных по каждому периоду
+        # Данные каждого периода индексируются ключом клиента, колонки сразу получают
+        # суффикс периода (client_id первого периода остается без суффикса)
+        period_parts = []
         for i, (period_key, df) in enumerate(self.data_frames.items()):
             period_num = i + 1
             
-            # Создание словаря для маппинга клиент -> данные с учетом агрегации
-            period_data_list = []
-            
-            for _, row in df.iterrows():
-                client_key = self._get_client_aggregation_key(row)
-                period_data_list.append({
-                    'client_key': client_key,
-                    'client_id': row['client_id'],
-                    'tab_number': row['tab_number'],
-                    'fio': row['fio'],
-                    'tb': row['tb'],
-                    'gosb': row['gosb'],
-                    'client_name': row['client_name'],
-                    'value': row['value']
-                })
-            
             # Группировка по ключу агрегации и суммирование
-            period_df = pd.DataFrame(period_data_list)
-            period_data = period_df.groupby('client_key').agg({
-                'client_id': 'first',
-                'tab_number': 'first',
-                'fio': 'first',
-                'tb': 'first',
-                'gosb': 'first',
-                'client_name': 'first',
-                'value': 'sum'  # Суммируем все значения по ключу агрегации
-            }).reset_index()
-            
-            # Добавление колонок с данными периода
-            clients_base = clients_base.merge(
-                period_data[['client_key', 'client_id', 'tab_number', 'fio', 'tb', 'gosb', 'client_name', 'value']],
-                on='client_key',
-                how='left',
-                suffixes=('', f'_period_{period_num}')
-            )
-            
-            # Переименование колонок для ясности
-            clients_base = clients_base.rename(columns={
-                'tab_number': f'tab_number_period_{period_num}',
-                'fio': f'fio_period_{period_num}',
-                'tb': f'tb_period_{period_num}',
-                'gosb': f'gosb_period_{period_num}',
-                'client_name': f'client_name_period_{period_num}',
-                'value': f'value_period_{period_num}'
-            })
+            period_data = self._aggregate_period(df).set_index('client_key')
+            period_data.columns = [
+                column if column == 'client_id' and period_num == 1 else f'{column}_period_{period_num}'
+                for column in period_data.columns
+            ]
+            period_parts.append(period_data)
+        
+        # Одно объединение всех периодов по ключу клиента вместо цепочки merge
+        clients_base = clients_base.join(pd.concat(period_parts, axis=1, join='outer'), on='client_key')
+        
+        # Заполнение пропущенных значений одним вызовом fillna для всех периодов
+        fill_values = {}
+        for i in range(1, self.file_count + 1):
+            fill_values[f'tab_number_period_{i}'] = 0
+            fill_values[f'value_period_{i}'] = 0
+            for column in ('fio', 'tb', 'gosb', 'client_name'):
+                fill_values[f'{column}_period_{i}'] = ''
+        clients_base = clients_base.fillna(fill_values)
+        
+        tab_columns = [f'tab_number_period_{i}' for i in range(1, self.file_count + 1)]
+        clients_base[tab_columns] = clients_base[tab_columns].astype(np.int32)
         
-        # Заполнение пропущенных значений
         for i in range(1, self.file_count + 1):
-            clients_base[f'tab_number_period_{i}'] = clients_base[f'tab_number_period_{i}'].fillna(0).astype(int)
-            clients_base[f'value_period_{i}'] = clients_base[f'value_period_{i}'].fillna(0)
-            clients_base[f'fio_period_{i}'] = clients_base[f'fio_period_{i}'].fillna('')
-            clients_base[f'tb_period_{i}'] = clients_base[f'tb_period_{i}'].fillna('')
-            clients_base[f'gosb_period_{i}'] = clients_base[f'gosb_period_{i}'].fillna('')
-            clients_base[f'client_name_period_{i}'] = clients_base[f'client_name_period_{i}'].fillna('')
-            
-            # Для табельного номера 70000000 устанавливаем "-" в ТБ и ГОСБ
-            mask_70000000 = clients_base[f'tab_number_period_{i}'] == 70000000
-            clients_base.loc[mask_70000000, f'tb_period_{i}'] = '-'
-            clients_base.loc[mask_70000000, f'gosb_period_{i}'] = '-'
-            
-            # Для табельного номера 90000000 устанавливаем "-" в ТБ и ГОСБ
-            mask_90000000 = clients_base[f'tab_number_period_{i}'] == 90000000
-            clients_base.loc[mask_90000000, f'tb_period_{i}'] = '-'
-            clients_base.loc[mask_90000000, f'gosb_period_{i}'] = '-'
-        
-        # Определение итогового табельного номера
-        clients_base['final_tab_number'] = 0
-        clients_base['final_fio'] = ''
-        clients_base['final_tb'] = ''
-        clients_base['final_gosb'] = ''
-        
-        # Логика выбора итогового табельного с учетом правил агрегации
-        for i in range(self.file_count, 0, -1):
-            mask = (clients_base[f'tab_number_period_{i}'] != 0) & (clients_base['final_tab_number'] == 0)
-            
-            # Применяем правила выбора менеджера
-            for idx in clients_base[mask].index:
-                row = clients_base.loc[idx]
-                client_aggregation_mode = self.aggregation_mode
-                
-                # Выбираем менеджера с наибольшим показателем в соответствии с правилами агрегации
-                best_manager = None
-                best_value = 0
-                
-                # Ищем менеджера с наибольшим показателем
-                for j in range(1, self.file_count + 1):
-                    if (row[f'tab_number_period_{j}'] != 0 and 
-                        row[f'value_period_{j}'] > best_value):
-                        
-                        # Проверяем соответствие правилам агрегации
-                        if self._check_manager_client_match(row, j, client_aggregation_mode):
-                            # Проверяем, что табельный номер не исключен (8XXYYYYY или 9XXYYYYY)
-                            tab_number = row[f'tab_number_period_{j}']
-                            if not self._is_excluded_tab_number(tab_number):
-                                best_manager = j
-                                best_value = row[f'value_period_{j}']
-                
-                if best_manager:
-                    clients_base.loc[idx, 'final_tab_number'] = row[f'tab_number_period_{best_manager}']
-                    clients_base.loc[idx, 'final_fio'] = row[f'fio_period_{best_manager}']
-                    clients_base.loc[idx, 'final_tb'] = row[f'tb_period_{best_manager}']
-                    clients_base.loc[idx, 'final_gosb'] = row[f'gosb_period_{best_manager}']
-                else:
-                    # Если не найден подходящий менеджер (все исключены), ищем любого менеджера
-                    fallback_manager = None
-                    fallback_value = 0
-                    
-                    for j in range(1, self.file_count + 1):
-                        if (row[f'tab_number_period_{j}'] != 0 and 
-                            row[f'value_period_{j}'] > fallback_value):
-                            
-                            # Проверяем соответствие правилам агрегации
-                            if self._check_manager_client_match(row, j, client_aggregation_mode):
-                                fallback_manager = j
-                                fallback_value = row[f'value_period_{j}']
-                    
-                    if fallback_manager:
-                        clients_base.loc[idx, 'final_tab_number'] = row[f'tab_number_period_{fallback_manager}']
-                        clients_base.loc[idx, 'final_fio'] = row[f'fio_period_{fallback_manager}']
-                        clients_base.loc[idx, 'final_tb'] = row[f'tb_period_{fallback_manager}']
-                        clients_base.loc[idx, 'final_gosb'] = row[f'gosb_period_{fallback_manager}']
+            # Для табельных номеров 70000000 и 90000000 устанавливаем "-" в ТБ и ГОСБ
+            self._set_dash_for_special_tab_numbers(
+                clients_base, f'tab_number_period_{i}', (f'tb_period_{i}', f'gosb_period_{i}')
+            )
+        
+        # Логика выбора итогового табельного с учетом правил агрегации:
+        # по каждому клиенту выбирается период с наибольшим положительным показателем
+        # (при равенстве - более ранний), сначала среди неисключенных табельных,
+        # затем среди всех
+        periods = range(1, self.file_count + 1)
+        tab_matrix = np.column_stack([clients_base[f'tab_number_period_{j}'].to_numpy() for j in periods])
+        value_matrix = np.column_stack([clients_base[f'value_period_{j}'].to_numpy(dtype='float64') for j in periods])
+        
+        candidates = (tab_matrix != 0) & (value_matrix > 0)
+        if self.aggregation_mode in (2, 3):
+            # Сравнение ТБ (и ГОСБ) периода с еще не заполненным итоговым значением
+            candidates &= np.column_stack([clients_base[f'tb_period_{j}'].to_numpy() == '' for j in periods])
+        if self.aggregation_mode == 3:
+            candidates &= np.column_stack([clients_base[f'gosb_period_{j}'].to_numpy() == '' for j in periods])
+        preferred = candidates & ~self._excluded_tab_numbers_mask(tab_matrix)
+        
+        has_preferred = preferred.any(axis=1)
+        eligible = np.where(has_preferred[:, None], preferred, candidates)
+        best_period = np.argmax(np.where(eligible, value_matrix, -np.inf), axis=1)
+        found = eligible.any(axis=1)
+        
+        # Итоговые колонки собираются в массивах и присваиваются один раз;
+        # клиенты без подходящего менеджера получают 0 и пустые строки
+        rows = np.flatnonzero(found)
+        best_columns = best_period[rows]
+        for target, source in (('final_tab_number', 'tab_number'), ('final_fio', 'fio'),
+                               ('final_tb', 'tb'), ('final_gosb', 'gosb')):
+            source_matrix = np.column_stack([clients_base[f'{source}_period_{j}'].to_numpy() for j in periods])
+            if source == 'tab_number':
+                target_values = np.zeros(len(clients_base), dtype=source_matrix.dtype)
+            else:
+                target_values = np.full(len(clients_base), '', dtype=object)
+            target_values[rows] = source_matrix[rows, best_columns]
+            clients_base[target] = target_values
         
         # Обработка серой зоны и прочих данных
         self._process_special_zones(clients_base)
         
-        # Для итогового табельного номера 70000000 устанавливаем "-" в ТБ и ГОСБ
-        mask_final_70000000 = clients_base['final_tab_number'] == 70000000
-        clients_base.loc[mask_final_70000000, 'final_tb'] = '-'
-        clients_base.loc[mask_final_70000000, 'final_gosb'] = '-'
-        
-        # Для итогового табельного номера 90000000 устанавливаем "-" в ТБ и ГОСБ
-        mask_final_90000000 = clients_base['final_tab_number'] == 90000000
-        clients_base.loc[mask_final_90000000, 'final_tb'] = '-'
-        clients_base.loc[mask_final_90000000, 'final_gosb'] = '-'
+        # Для итоговых табельных номеров 70000000 и 90000000 устанавливаем "-" в ТБ и ГОСБ
+        self._set_dash_for_special_tab_numbers(clients_base, 'final_tab_number', ('final_tb', 'final_gosb'))
         
-        logger.debug(f"База клиентов создана: {len(clients_base)} уникальных клиентов")
+        logger.debug("База клиентов создана: %s уникальных клиентов", len(clients_base))
         return clients_base
     
+    def _set_dash_for_special_tab_numbers(self, clients_base: pd.DataFrame, tab_column: str,
+                                          target_columns: Tuple[str, ...]) -> None:
+        """
+        Замена значений на "-" в строках с табельными номерами 70000000 и 90000000
+        Колонки пересобираются через np.where, без поэлементной записи через .loc
+        
+        Args:
+            clients_base (pd.DataFrame): База клиентов (изменяется на месте)
+            tab_column (str): Колонка табельного номера
+            target_columns (Tuple[str, ...]): Колонки, в которые записывается "-"
+        """
+        tab_numbers = clients_base[tab_column].to_numpy()
+        is_special = (tab_numbers == 70000000) | (tab_numbers == 90000000)
+        if not is_special.any():
+            return
+        for column in target_columns:
+            clients_base[column] = np.where(is_special, '-', clients_base[column].to_numpy(dtype=object))
+    
     def calculate_growth(self, clients_base: pd.DataFrame) -> pd.DataFrame:
         """
         Расчет приростов согласно формуле
@@ -497,25 +839,37 @@ class PeriodComparison:
         """
         logger.debug("Начинаем расчет приростов")
         
-        # Расчет прироста в зависимости от количества периодов
-        if self.file_count == 2:
-            # Прирост = T-0 - T-1 (текущий - прошлый)
-            clients_base['growth'] = (
-                clients_base['value_period_1'] - clients_base['value_period_2']
-            )
-        elif self.file_count == 3:
-            # Прирост = ((T-0) - (T-1)) - ((T-1) - (T-2))
-            period_0_1 = clients_base['value_period_1'] - clients_base['value_period_2']
-            period_1_2 = clients_base['value_period_2'] - clients_base['value_period_3']
-            clients_base['growth'] = period_0_1 - period_1_2
-        else:
-            raise ValueError(f"Неподдерживаемое количество периодов: {self.file_count}")
+        clients_base['growth'] = self._calculate_period_growth(
+            [clients_base[f'value_period_{i}'] for i in range(1, self.file_count + 1)]
+        )
         
         logger.debug("Расчет приростов завершен")
-        logger.debug(f"Приросты рассчитаны для {len(clients_base)} клиентов")
+        logger.debug("Приросты рассчитаны для %s клиентов", len(clients_base))
         
         return clients_base
     
+    def _calculate_period_growth(self, period_values: List[pd.Series]) -> np.ndarray:
+        """
+        Прирост по показателям периодов (разность порядка N-1):
+        2 периода: Прирост = T-0 - T-1 (текущий - прошлый)
+        3 периода: Прирост = ((T-0) - (T-1)) - ((T-1) - (T-2))
+        
+        Args:
+            period_values (List[pd.Series]): Показатели периодов 1..N (период 1 - T-0)
+            
+        Returns:
+            np.ndarray: Прирост для каждой строки
+            
+        Raises:
+            ValueError: Если количество периодов не 2 и не 3
+        """
+        if len(period_values) not in (2, 3):
+            raise ValueError(f"Неподдерживаемое количество периодов: {len(period_values)}")
+        
+        # Показатели периодов в одной матрице, от T-(N-1) к T-0
+        values = np.column_stack([column.to_numpy() for column in reversed(period_values)])
+        return np.diff(values, n=len(period_values) - 1, axis=1)[:, 0]
+    
     def create_managers_summary(self, clients_base: pd.DataFrame) -> pd.DataFrame:
         """
         Создание сводки по менеджерам
@@ -528,55 +882,30 @@ class PeriodComparison:
         """
         logger.debug("Создание сводки по менеджерам")
         
-        # Группировка по ключу агрегации менеджеров
-        manager_aggregation_mode = self.aggregation_mode
-        
         # Создаем ключ агрегации для менеджеров
-        clients_base['manager_key'] = clients_base.apply(
-            lambda row: self._get_manager_aggregation_key_from_final(row), axis=1
-        )
-        
-        agg_dict = {
-            'final_fio': 'first',
-            'final_tb': 'first',
-            'final_gosb': 'first',
-            'value_period_1': 'sum',
-            'value_period_2': 'sum',
-            'growth': 'sum'
-        }
+        clients_base['manager_key'] = self._get_manager_aggregation_keys_from_final(clients_base)
+        codes, manager_keys = pd.factorize(clients_base['manager_key'], sort=True)
         
-        # Добавляем value_period_3 только если есть 3 периода
+        # Колонки "первого значения" и суммируемые колонки (value_3 только если есть 3 периода)
+        first_columns = {'final_fio': 'fio', 'final_tb': 'tb', 'final_gosb': 'gosb'}
+        sum_columns = {'value_period_1': 'value_1', 'value_period_2': 'value_2', 'growth': 'total_growth'}
         if self.file_count == 3:
-            agg_dict['value_period_3'] = 'sum'
-        
-        managers_summary = clients_base.groupby('manager_key').agg(agg_dict).reset_index()
-        
-        # Переименование колонок для соответствия выходному формату
-        rename_dict = {
-            'final_fio': 'fio',
-            'final_tb': 'tb',
-            'final_gosb': 'gosb',
-            'value_period_1': 'value_1',
-            'value_period_2': 'value_2',
-            'growth': 'total_growth'
-        }
+            sum_columns['value_period_3'] = 'value_3'
         
-        # Добавляем value_period_3 только если есть 3 периода
-        if self.file_count == 3:
-            rename_dict['value_period_3'] = 'value_3'
+        managers_summary = pd.DataFrame({'manager_key': np.asarray(manager_keys, dtype=object)})
+        for column, name in first_columns.items():
+            managers_summary[name] = self._group_first(clients_base[column].to_numpy(), codes, len(manager_keys))
         
-        managers_summary = managers_summary.rename(columns=rename_dict)
+        # Пропуски не участвуют в сумме, как в groupby().sum()
+        values = np.column_stack([clients_base[column].to_numpy(dtype='float64') for column in sum_columns])
+        sums = self._group_sum(codes, np.where(np.isnan(values), 0.0, values), len(manager_keys))
+        for position, (column, name) in enumerate(sum_columns.items()):
+            managers_summary[name] = sums[:, position].astype(clients_base[column].dtype)
         
         # Добавляем колонку tab_number из manager_key
-        managers_summary['tab_number'] = managers_summary['manager_key'].apply(
-            lambda x: int(x.split('_')[0]) if '_' in x else int(x)
-        )
-        
-        # Удаление колонки value_3 если только 2 периода
-        if self.file_count == 2:
-            managers_summary = managers_summary.drop(columns=['value_3'], errors='ignore')
+        managers_summary['tab_number'] = managers_summary['manager_key'].str.split('_').str[0].astype(np.int64)
         
-        logger.debug(f"Сводка по менеджерам создана: {len(managers_summary)} уникальных менеджеров")
+        logger.debug("Сводка по менеджерам создана: %s уникальных менеджеров", len(managers_summary))
         return managers_summary
     
     def create_managers_deal_date_summary(self, clients_base: pd.DataFrame) -> pd.DataFrame:
@@ -592,62 +921,38 @@ class PeriodComparison:
         """
         logger.debug("Создание сводки по менеджерам по дате сделки")
         
-        # Создаем словарь для хранения данных по менеджерам
-        managers_data = {}
-        
-        # Обрабатываем каждый период отдельно
+        # Сводки по каждому периоду: первое значение атрибутов и сумма показателя по табельному номеру
+        period_summaries = {}
         for period in range(1, self.file_count + 1):
             period_key = f'period_{period}'
             if period_key in self.data_frames:
-                df = self.data_frames[period_key]
-                
-                # Группируем по табельному номеру и суммируем показатели
-                period_summary = df.groupby('tab_number').agg({
+                period_summaries[period] = self.data_frames[period_key].groupby('tab_number', observed=True).agg({
                     'fio': 'first',
-                    'tb': 'first', 
+                    'tb': 'first',
                     'gosb': 'first',
                     'value': 'sum'
-                }).reset_index()
-                
-                # Сохраняем данные для каждого менеджера
-                for _, row in period_summary.iterrows():
-                    tab_num = row['tab_number']
-                    if tab_num not in managers_data:
-                        managers_data[tab_num] = {
-                            'tab_number': tab_num,
-                            'fio': row['fio'],
-                            'tb': row['tb'],
-                            'gosb': row['gosb'],
-                            'value_1': 0,
-                            'value_2': 0,
-                            'value_3': 0
-                        }
-                    
-                    # Записываем показатель для соответствующего периода
-                    if period == 1:
-                        managers_data[tab_num]['value_1'] = row['value']
-                    elif period == 2:
-                        managers_data[tab_num]['value_2'] = row['value']
-                    elif period == 3 and self.file_count == 3:
-                        managers_data[tab_num]['value_3'] = row['value']
-        
-        # Преобразуем словарь в DataFrame
-        managers_list = list(managers_data.values())
-        managers_summary = pd.DataFrame(managers_list)
-        
-        # Расчет прироста по дате сделки
-        if self.file_count == 2:
-            # Прирост = T-0 - T-1 (текущий - прошлый)
-            managers_summary['total_growth'] = (
-                managers_summary['value_1'] - managers_summary['value_2']
-            )
-        elif self.file_count == 3:
-            # Прирост = ((T-0) - (T-1)) - ((T-1) - (T-2))
-            period_0_1 = managers_summary['value_1'] - managers_summary['value_2']
-            period_1_2 = managers_summary['value_2'] - managers_summary['value_3']
-            managers_summary['total_growth'] = period_0_1 - period_1_2
+                })
+        
+        # Менеджеры в порядке первого появления по периодам, атрибуты берутся из первого такого периода
+        attributes = pd.concat(
+            [summary[['fio', 'tb', 'gosb']].astype(str) for summary in period_summaries.values()]
+        )
+        attributes = attributes[~attributes.index.duplicated()]
         
-        logger.debug(f"Сводка по менеджерам по дате сделки создана: {len(managers_summary)} уникальных менеджеров")
+        managers_summary = attributes.reset_index()
+        for period in (1, 2, 3):
+            if period in period_summaries:
+                values = period_summaries[period]['value'].reindex(attributes.index)
+                managers_summary[f'value_{period}'] = values.fillna(0).to_numpy()
+            else:
+                managers_summary[f'value_{period}'] = 0
+        
+        # Расчет прироста по дате сделки (по той же формуле, что и для клиентов)
+        managers_summary['total_growth'] = self._calculate_period_growth(
+            [managers_summary[f'value_{i}'] for i in range(1, self.file_count + 1)]
+        )
+        
+        logger.debug("Сводка по менеджерам по дате сделки создана: %s уникальных менеджеров", len(managers_summary))
         return managers_summary
     
     def create_output_file(self, clients_base: pd.DataFrame, managers_summary: pd.DataFrame, managers_deal_date_summary: pd.DataFrame = None) -> None:
@@ -659,70 +964,87 @@ class PeriodComparison:
             managers_summary (pd.DataFrame): Сводка по менеджерам
             managers_deal_date_summary (pd.DataFrame, optional): Сводка по менеджерам по дате сделки
         """
-        # Формирование имени файла с временной меткой
-        base_name = self.output_config['file_name']
-        if self.output_config.get('add_timestamp', False):
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-            output_file = f"{base_name}_{timestamp}.xlsx"
-        else:
-            output_file = f"{base_name}.xlsx"
+        # Имя файла с временной меткой вычислено при загрузке конфигурации
+        output_file = self.output_config['file_name_resolved']
         
         logger.log_output_creation_start(output_file)
-        logger.debug(f"Создаем выходной файл: {output_file}")
+        logger.debug("Создаем выходной файл: %s", output_file)
         
         try:
-            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-                # Подготовка данных для листа клиентов
-                columns_to_select = [
-                    'client_id',
-                    'client_name_period_1',
-                    'value_period_1',
-                    'value_period_2',
-                    'growth',
-                    'final_tab_number',
-                    'final_fio',
-                    'final_gosb',
-                    'final_tb'
-                ]
-                
-                # Добавляем колонку value_period_3 только если есть 3 периода
-                if self.file_count == 3:
-                    columns_to_select.insert(4, 'value_period_3')
-                
-                clients_output = clients_base[columns_to_select].copy()
-                
-                # Удаление None колонок
-                clients_output = clients_output.dropna(axis=1, how='all')
-                
-                # Переименование колонок для читаемости
-                column_mapping = {
-                    'client_id': 'ID client',
-                    'client_name_period_1': 'Client Name',
-                    'value_period_1': 'val (T-0)',
-                    'value_period_2': 'val (T-1)',
-                    'value_period_3': 'val (T-2)',
-                    'growth': 'Gain',
-                    'final_tab_number': 'TN (final)',
-                    'final_fio': 'ФИО КМ (final)',
-                    'final_gosb': 'ГОСБ',
-                    'final_tb': 'ТБ'
-                }
-                
-                clients_output = clients_output.rename(columns=column_mapping)
-                
-                # Запись листа клиентов
-                clients_output.to_excel(
-                    writer,
-                    sheet_name=self.output_config['sheets']['clients'],
-                    index=False
-                )
-                
-                # Подготовка данных для листа менеджеров
-                managers_output = managers_summary.copy()
+            # Список листов для записи: (название листа, ключ форматирования, данные)
+            output_sheets = []
+            
+            # Подготовка данных для листа клиентов
+            columns_to_select = [
+                'client_id',
+                'client_name_period_1',
+                'value_period_1',
+                'value_period_2',
+                'growth',
+                'final_tab_number',
+                'final_fio',
+                'final_gosb',
+                'final_tb'
+            ]
+            
+            # Добавляем колонку value_period_3 только если есть 3 периода
+            if self.file_count == 3:
+                columns_to_select.insert(4, 'value_period_3')
+            
+            # Полностью пустые колонки не выводятся (отбираются до выборки, без копирования данных;
+            # каждая следующая операция возвращает новый DataFrame, исходные данные не меняются)
+            columns_to_select = [column for column in columns_to_select if clients_base[column].notna().any()]
+            clients_output = clients_base[columns_to_select]
+            
+            # Переименование колонок для читаемости
+            column_mapping = {
+                'client_id': 'ID client',
+                'client_name_period_1': 'Client Name',
+                'value_period_1': 'val (T-0)',
+                'value_period_2': 'val (T-1)',
+                'value_period_3': 'val (T-2)',
+                'growth': 'Gain',
+                'final_tab_number': 'TN (final)',
+                'final_fio': 'ФИО КМ (final)',
+                'final_gosb': 'ГОСБ',
+                'final_tb': 'ТБ'
+            }
+            
+            clients_output = clients_output.rename(columns=column_mapping)
+            clients_output = self._apply_column_formatters(clients_output, 'clients')
+            
+            output_sheets.append((self.output_config['sheets']['clients'], 'clients', clients_output))
+            
+            # Подготовка данных для листа менеджеров
+            managers_output = managers_summary
+            
+            # Переименование колонок для читаемости
+            managers_column_mapping = {
+                'tab_number': 'TN (unic)',
+                'fio': 'ФИО',
+                'tb': 'ТБ',
+                'gosb': 'ГОСБ',
+                'value_1': 'val (T-0)',
+                'value_2': 'val (T-1)',
+                'value_3': 'val (T-2)',
+                'total_growth': 'Gain (total)'
+            }
+            
+            managers_output = managers_output.rename(columns=managers_column_mapping)
+            
+            # Удаление колонки val (T-2) если только 2 периода
+            if self.file_count == 2:
+                managers_output = managers_output.drop(columns=['val (T-2)'], errors='ignore')
+            managers_output = self._apply_column_formatters(managers_output, 'managers')
+            
+            output_sheets.append((self.output_config['sheets']['managers'], 'managers', managers_output))
+            
+            # Создание листа менеджеров по дате сделки (если есть данные)
+            if managers_deal_date_summary is not None:
+                managers_deal_date_output = managers_deal_date_summary
                 
                 # Переименование колонок для читаемости
-                managers_column_mapping = {
+                managers_deal_date_column_mapping = {
                     'tab_number': 'TN (unic)',
                     'fio': 'ФИО',
                     'tb': 'ТБ',
@@ -733,61 +1055,38 @@ class PeriodComparison:
                     'total_growth': 'Gain (total)'
                 }
                 
-                managers_output = managers_output.rename(columns=managers_column_mapping)
+                managers_deal_date_output = managers_deal_date_output.rename(columns=managers_deal_date_column_mapping)
                 
                 # Удаление колонки val (T-2) если только 2 периода
                 if self.file_count == 2:
-                    managers_output = managers_output.drop(columns=['val (T-2)'], errors='ignore')
-                
-                # Запись листа менеджеров
-                managers_output.to_excel(
-                    writer,
-                    sheet_name=self.output_config['sheets']['managers'],
-                    index=False
+                    managers_deal_date_output = managers_deal_date_output.drop(columns=['val (T-2)'], errors='ignore')
+                managers_deal_date_output = self._apply_column_formatters(
+                    managers_deal_date_output, 'managers_deal_date'
                 )
                 
-                # Создание листа менеджеров по дате сделки (если есть данные)
-                if managers_deal_date_summary is not None:
-                    managers_deal_date_output = managers_deal_date_summary.copy()
-                    
-                    # Переименование колонок для читаемости
-                    managers_deal_date_column_mapping = {
-                        'tab_number': 'TN (unic)',
-                        'fio': 'ФИО',
-                        'tb': 'ТБ',
-                        'gosb': 'ГОСБ',
-                        'value_1': 'val (T-0)',
-                        'value_2': 'val (T-1)',
-                        'value_3': 'val (T-2)',
-                        'total_growth': 'Gain (total)'
-                    }
-                    
-                    managers_deal_date_output = managers_deal_date_output.rename(columns=managers_deal_date_column_mapping)
-                    
-                    # Удаление колонки val (T-2) если только 2 периода
-                    if self.file_count == 2:
-                        managers_deal_date_output = managers_deal_date_output.drop(columns=['val (T-2)'], errors='ignore')
-                    
-                    # Запись листа менеджеров по дате сделки
-                    managers_deal_date_output.to_excel(
-                        writer,
-                        sheet_name=self.output_config['sheets']['managers_deal_date'],
-                        index=False
-                    )
-                
-                # Создание листа детализации клиентов
-                clients_detail = self._create_clients_detail_sheet(clients_base)
-                clients_detail.to_excel(
-                    writer,
-                    sheet_name='Детализация клиентов',
-                    index=False
-                )
-            
-            # Применение форматирования после записи всех данных
-            self._apply_formatting_to_file(output_file)
+                output_sheets.append((
+                    self.output_config['sheets']['managers_deal_date'],
+                    'managers_deal_date',
+                    managers_deal_date_output
+                ))
+            
+            # Создание листа детализации клиентов
+            clients_detail = self._create_clients_detail_sheet(clients_base)
+            clients_detail = self._apply_column_formatters(clients_detail, 'clients_detail')
+            output_sheets.append(('Детализация клиентов', 'clients_detail', clients_detail))
+            
+            engine = self._get_excel_writer_engine(self.output_config.get('engine', 'openpyxl'))
+            logger.debug("Движок записи Excel: %s", engine)
+            
+            if engine == 'xlsxwriter':
+                # Потоковая запись с форматированием в одном проходе
+                self._write_output_xlsxwriter(output_file, output_sheets)
+            else:
+                # Потоковая запись через openpyxl (write_only) с форматированием в одном проходе
+                self._write_output_openpyxl(output_file, output_sheets)
             
             logger.log_output_created(output_file)
-            logger.debug(f"Выходной файл создан: {output_file}")
+            logger.debug("Выходной файл создан: %s", output_file)
             
         except Exception as e:
             error_msg = f"Ошибка создания выходного файла: {str(e)}"
@@ -832,7 +1131,7 @@ class PeriodComparison:
         ])
         
         # Создаем DataFrame с детализацией
-        clients_detail = clients_base[detail_columns].copy()
+        clients_detail = clients_base[detail_columns]
         
         # Переименовываем колонки для читаемости
         column_mapping = {
@@ -866,228 +1165,343 @@ class PeriodComparison:
         # Сортируем по ID клиента для удобства
         clients_detail = clients_detail.sort_values('ID клиента')
         
-        logger.debug(f"Создан лист детализации с {len(clients_detail)} записями")
+        logger.debug("Создан лист детализации с %s записями", len(clients_detail))
         return clients_detail
     
-    def _apply_formatting_to_file(self, file_path: str) -> None:
+    def _apply_column_formatters(self, df: pd.DataFrame, sheet_key: str) -> pd.DataFrame:
         """
-        Применение форматирования к созданному Excel файлу
+        Векторное преобразование значений колонок перед записью (дополнение нулями)
+        Использует функции, предкомпилированные в COMPILED_FORMATTERS
         
         Args:
-            file_path: Путь к Excel файлу
+            df: Данные листа с итоговыми названиями колонок
+            sheet_key: Ключ листа в настройках форматирования
+            
+        Returns:
+            pd.DataFrame: Данные с преобразованными колонками
         """
-        logger.debug("Применение форматирования к файлу")
+        for col_name, formatter in COMPILED_FORMATTERS.get(sheet_key, {}).items():
+            if col_name in df.columns:
+                df[col_name] = formatter(df[col_name])
+        return df
+    
+    def _get_excel_writer_engine(self, engine: str) -> str:
+        """
+        Определение движка записи Excel файлов
+        Если xlsxwriter недоступен, используется openpyxl
         
-        try:
-            from openpyxl import load_workbook
-            from openpyxl.utils import get_column_letter
-            
-            # Загрузка файла
-            wb = load_workbook(file_path)
-            
-            # Получение настроек форматирования
-            formatting_config = self.output_config.get('formatting', {})
-            
-            # Форматирование листа клиентов
-            if 'clients' in formatting_config:
-                clients_sheet = wb[self.output_config['sheets']['clients']]
-                self._format_sheet_columns(clients_sheet, formatting_config['clients'])
-                self._apply_autofilter_and_freeze(clients_sheet)
-            
-            # Форматирование листа менеджеров
-            if 'managers' in formatting_config:
-                managers_sheet = wb[self.output_config['sheets']['managers']]
-                self._format_sheet_columns(managers_sheet, formatting_config['managers'])
-                self._apply_autofilter_and_freeze(managers_sheet)
-            
-            # Форматирование листа менеджеров по дате сделки
-            if 'managers_deal_date' in formatting_config:
-                managers_deal_date_sheet = wb[self.output_config['sheets']['managers_deal_date']]
-                self._format_sheet_columns(managers_deal_date_sheet, formatting_config['managers_deal_date'])
-                self._apply_autofilter_and_freeze(managers_deal_date_sheet)
-            
-            # Форматирование листа детализации клиентов
-            if 'Детализация клиентов' in wb.sheetnames:
-                clients_detail_sheet = wb['Детализация клиентов']
-                # Применяем форматирование колонок для листа детализации
-                if 'clients_detail' in formatting_config:
-                    self._format_sheet_columns(clients_detail_sheet, formatting_config['clients_detail'])
-                self._apply_autofilter_and_freeze(clients_detail_sheet)
-                # Автоподбор ширины колонок
-                for column in clients_detail_sheet.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 2, 50)  # Максимум 50 символов
-                    clients_detail_sheet.column_dimensions[column_letter].width = adjusted_width
-            
-            # Сохранение файла с форматированием
-            wb.save(file_path)
-            wb.close()
-            
-            logger.debug("Форматирование применено успешно")
+        Args:
+            engine: Движок из конфигурации выходного файла
             
-        except Exception as e:
-            logger.log_error(f"Ошибка применения форматирования: {str(e)}")
-            # Не прерываем выполнение, так как форматирование не критично
+        Returns:
+            str: Доступный движок записи
+        """
+        if engine == 'xlsxwriter':
+            if importlib.util.find_spec('xlsxwriter') is None:
+                logger.debug("Модуль xlsxwriter не найден, используем движок openpyxl")
+                return 'openpyxl'
+        return engine
     
-    def _format_sheet_columns(self, sheet, column_formats: dict) -> None:
+    def _calculate_column_widths(self, df: pd.DataFrame) -> List[int]:
         """
-        Форматирование колонок конкретного листа
+        Расчет ширины колонок по данным листа (заголовок и значения)
         
         Args:
-            sheet: Лист Excel файла
-            column_formats: Словарь с настройками форматирования колонок
+            df: Данные листа
+            
+        Returns:
+            List[int]: Ширина каждой колонки (максимум 50 символов)
         """
-        from openpyxl.styles import Font, Alignment
-        from openpyxl.utils import get_column_letter
+        widths = []
+        for col_name in df.columns:
+            values = df[col_name].dropna()
+            # Целые значения во float-колонке в Excel отображаются без ".0",
+            # дробные оцениваем с точностью до копеек
+            if values.dtype.kind == 'f':
+                if (values == values.round()).all():
+                    values = values.astype('int64')
+                else:
+                    values = values.round(2)
+            max_length = len(str(col_name))
+            if len(values) > 0:
+                max_length = max(max_length, int(values.astype(str).str.len().max()))
+            widths.append(min(max_length + 2, 50))  # Максимальная ширина 50
+        return widths
+    
+    def _write_output_xlsxwriter(self, file_path: str, output_sheets: list) -> None:
+        """
+        Запись выходного файла через xlsxwriter в режиме constant_memory
+        Строки пишутся по порядку, форматирование колонок, автофильтр и
+        закрепление задаются при записи без повторного открытия файла
         
-        # Создание стилей для разных типов данных
-        number_font = Font(name='Arial', size=10)
-        number_alignment = Alignment(horizontal='right')
-        
-        text_font = Font(name='Arial', size=10)
-        text_alignment = Alignment(horizontal='left')
-        
-        # Получение заголовков для поиска колонок
-        headers = []
-        for cell in sheet[1]:
-            headers.append(cell.value)
-        
-        # Применение форматирования к каждой колонке
-        for col_name, format_config in column_formats.items():
-            # Поиск индекса колонки по имени
-            col_idx = None
-            for i, header in enumerate(headers, 1):
-                if header == col_name:
-                    col_idx = i
-                    break
-            
-            if col_idx is None:
-                logger.debug(f"Колонка '{col_name}' не найдена в листе")
-                continue
+        Args:
+            file_path: Путь к выходному файлу
+            output_sheets: Список листов (название листа, ключ форматирования, данные)
+        """
+        import xlsxwriter
+        
+        workbook_options = self.output_config.get('engine_kwargs', {}).get('options', {})
+        workbook = xlsxwriter.Workbook(file_path, workbook_options)
+        
+        try:
+            # Заголовок пишется стилем по умолчанию, а не стилем колонки
+            header_format = workbook.add_format()
+            # Стили ячеек создаются один раз для каждого сочетания типа и формата
+            cell_formats = {}
+            
+            for sheet_name, format_key, sheet_data in output_sheets:
+                worksheet = workbook.add_worksheet(sheet_name)
+                widths = self._calculate_column_widths(sheet_data)
                 
-            col_letter = get_column_letter(col_idx)
-            logger.debug(f"Форматирование колонки {col_name} ({col_letter})")
-            
-            # Применение стиля и формата
-            if format_config['type'] == 'number':
-                # Применение числового формата
-                for row in range(2, sheet.max_row + 1):
-                    cell = sheet[f"{col_letter}{row}"]
-                    cell.number_format = format_config.get('format', '#,##0.00')
-                    cell.font = number_font
-                    cell.alignment = number_alignment
-            elif format_config['type'] == 'text':
-                # Применение текстового стиля
-                for row in range(2, sheet.max_row + 1):
-                    cell = sheet[f"{col_letter}{row}"]
-                    cell.font = text_font
-                    cell.alignment = text_alignment
-            elif format_config['type'] == 'text_padded':
-                # Применение текстового стиля с дополнением нулями
-                pad_length = int(format_config.get('format', '8'))
-                pad_char = format_config.get('pad_char', '0')
+                # Схема листа сопоставляется с колонками данных один раз
+                specs_by_name = {spec.name: spec for spec in SHEET_SCHEMAS.get(format_key, ())}
+                column_specs = [specs_by_name.get(col_name) for col_name in sheet_data.columns]
                 
-                for row in range(2, sheet.max_row + 1):
-                    cell = sheet[f"{col_letter}{row}"]
-                    # Дополняем значение нулями до нужной длины
-                    if cell.value is not None:
-                        cell.value = str(cell.value).zfill(pad_length)
-                    cell.font = text_font
-                    cell.alignment = text_alignment
-        
-        # Автоподбор ширины колонок
-        for column in sheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            
-            adjusted_width = min(max_length + 2, 50)  # Максимальная ширина 50
-            sheet.column_dimensions[column_letter].width = adjusted_width
+                # Форматирование колонок задается до записи строк
+                for col_idx, spec in enumerate(column_specs):
+                    cell_format = None
+                    if spec is not None:
+                        style_key = (spec.kind == 'number', spec.num_format)
+                        if style_key not in cell_formats:
+                            if spec.kind == 'number':
+                                cell_formats[style_key] = workbook.add_format({
+                                    'font_name': 'Arial', 'font_size': 10,
+                                    'align': 'right', 'num_format': spec.num_format
+                                })
+                            else:
+                                cell_formats[style_key] = workbook.add_format({
+                                    'font_name': 'Arial', 'font_size': 10, 'align': 'left'
+                                })
+                        cell_format = cell_formats[style_key]
+                    worksheet.set_column(col_idx, col_idx, widths[col_idx], cell_format)
+                
+                # Запись заголовка и строк по порядку (требование constant_memory)
+                worksheet.write_row(0, 0, list(sheet_data.columns), header_format)
+                rows = sheet_data.astype(object).where(sheet_data.notna(), None)
+                for row_idx, row in enumerate(rows.itertuples(index=False, name=None), 1):
+                    worksheet.write_row(row_idx, 0, row)
+                
+                # Автофильтр ко всем данным и закрепление первой строки
+                if len(sheet_data) > 0:
+                    worksheet.autofilter(0, 0, len(sheet_data), len(sheet_data.columns) - 1)
+                worksheet.freeze_panes(1, 0)
+                logger.debug("Лист %s записан: %s строк", sheet_name, len(sheet_data))
+        finally:
+            workbook.close()
     
-    def _apply_autofilter_and_freeze(self, sheet) -> None:
+    def _write_output_openpyxl(self, file_path: str, output_sheets: list) -> None:
         """
-        Применение автофильтра и закрепления первой строки
+        Запись выходного файла через openpyxl в режиме write_only
+        Строки пишутся потоком; стили колонок, ширина, автофильтр и закрепление
+        задаются при записи без обхода ячеек готовой книги
         
         Args:
-            sheet: Лист Excel файла
+            file_path: Путь к выходному файлу
+            output_sheets: Список листов (название листа, ключ форматирования, данные)
         """
-        try:
-            from openpyxl.utils import get_column_letter
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.utils import get_column_letter
+        
+        workbook = Workbook(write_only=True)
+        
+        for sheet_name, format_key, sheet_data in output_sheets:
+            worksheet = workbook.create_sheet(sheet_name)
+            
+            # Ширина колонок, автофильтр и закрепление задаются до записи строк
+            for col_idx, width in enumerate(self._calculate_column_widths(sheet_data), 1):
+                worksheet.column_dimensions[get_column_letter(col_idx)].width = width
+            if len(sheet_data) > 0:
+                worksheet.auto_filter.ref = f"A1:{get_column_letter(len(sheet_data.columns))}{len(sheet_data) + 1}"
+            worksheet.freeze_panes = "A2"
+            
+            # Для форматируемых колонок создается ячейка-образец с именованным стилем;
+            # строка записывается сразу при append, поэтому образец переиспользуется
+            specs_by_name = {spec.name: spec for spec in SHEET_SCHEMAS.get(format_key, ())}
+            styled_cells = {}
+            for col_idx, col_name in enumerate(sheet_data.columns):
+                spec = specs_by_name.get(col_name)
+                if spec is not None:
+                    cell = WriteOnlyCell(worksheet)
+                    cell.style = self._get_named_style(workbook, spec)
+                    styled_cells[col_idx] = cell
+            
+            # Заголовок пишется стилем по умолчанию
+            worksheet.append(list(sheet_data.columns))
+            rows = sheet_data.astype(object).where(sheet_data.notna(), None)
+            for row in rows.itertuples(index=False, name=None):
+                row = list(row)
+                for col_idx, cell in styled_cells.items():
+                    if row[col_idx] is not None:
+                        cell.value = row[col_idx]
+                        row[col_idx] = cell
+                worksheet.append(row)
+            logger.debug("Лист %s записан: %s строк", sheet_name, len(sheet_data))
+        
+        workbook.save(file_path)
+    
+    def _get_named_style(self, workbook, spec) -> str:
+        """
+        Именованный стиль книги для колонки выходного листа
+        Стиль регистрируется в книге один раз и затем назначается ячейкам по имени
+        (значения text_padded дополнены нулями до записи, см. _apply_column_formatters)
+        
+        Args:
+            workbook: Книга openpyxl
+            spec: Описание колонки (ColumnSpec)
             
-            # Применение автофильтра ко всем данным
-            if sheet.max_row > 1:
-                sheet.auto_filter.ref = f"A1:{get_column_letter(sheet.max_column)}{sheet.max_row}"
+        Returns:
+            str: Название стиля
+        """
+        from openpyxl.styles import Font, Alignment, NamedStyle
+        
+        if spec.kind == 'number':
+            style_name = f"Число {spec.num_format}"
+            style_args = {'number_format': spec.num_format, 'alignment': Alignment(horizontal='right')}
+        else:
+            style_name = "Текст"
+            style_args = {'alignment': Alignment(horizontal='left')}
+        
+        if style_name not in workbook.named_styles:
+            workbook.add_named_style(NamedStyle(name=style_name, font=Font(name='Arial', size=10), **style_args))
+        return style_name
+    
+    def _get_client_aggregation_keys(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Векторное получение ключей агрегации клиентов для всех строк периода
+        в зависимости от режима: client_id, client_id_tb или client_id_tb_gosb
+        
+        Args:
+            df (pd.DataFrame): Данные периода
             
-            # Закрепление первой строки
-            sheet.freeze_panes = "A2"
+        Returns:
+            pd.Series: Ключи агрегации
+        """
+        keys = self._column_as_text(df['client_id'])
+        if self.aggregation_mode in (2, 3):
+            # Агрегация по client_id + tb
+            keys = keys + '_' + self._column_as_text(df['tb'])
+        if self.aggregation_mode == 3:
+            # Агрегация по client_id + tb + gosb
+            keys = keys + '_' + self._column_as_text(df['gosb'])
+        return keys
+    
+    def _column_as_text(self, column: pd.Series) -> pd.Series:
+        """
+        Строковое представление значений колонки (как str(value) для каждой строки)
+        Для категориальных колонок str вызывается только для категорий
+        
+        Args:
+            column (pd.Series): Колонка данных
             
-            logger.debug(f"Автофильтр и закрепление применены к листу {sheet.title}")
+        Returns:
+            pd.Series: Строковые значения (object)
+        """
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # Код -1 (пропуск) указывает на последний элемент - 'nan'
+            categories = np.append(column.cat.categories.map(str).to_numpy(dtype=object), 'nan')
+            return pd.Series(categories[column.cat.codes.to_numpy()], index=column.index)
+        return column.map(str).astype(object)
+    
+    def _aggregate_period(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Агрегация данных периода по ключу клиента без groupby
+        Строки сортируются по коду ключа один раз, показатель суммируется через
+        np.add.reduceat, для остальных колонок берется первое непустое значение
+        (как в groupby().agg('first'))
+        
+        Args:
+            df (pd.DataFrame): Данные периода
             
-        except Exception as e:
-            logger.log_error(f"Ошибка применения автофильтра и закрепления: {str(e)}")
+        Returns:
+            pd.DataFrame: Данные периода, по одной строке на ключ агрегации
+        """
+        codes, unique_keys = pd.factorize(self._get_client_aggregation_keys(df), sort=True)
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(order) else order
+        
+        period_data = {'client_key': np.asarray(unique_keys, dtype=object)}
+        # Табельные номера int32 без пропусков: первое значение группы берется
+        # в исходном типе, без перевода в object
+        tab_numbers = df['tab_number'].to_numpy()[order]
+        period_data['tab_number'] = tab_numbers[starts]
+        for column in ('client_id', 'fio', 'tb', 'gosb', 'client_name'):
+            values = df[column].to_numpy(dtype=object)[order]
+            # Первое непустое значение в каждой группе
+            present = np.flatnonzero(pd.notna(values))
+            present_codes = sorted_codes[present]
+            first = present[np.r_[True, present_codes[1:] != present_codes[:-1]]] if len(present) else present
+            column_values = np.full(len(unique_keys), np.nan, dtype=object)
+            column_values[sorted_codes[first]] = values[first]
+            period_data[column] = column_values
+        
+        values = df['value'].to_numpy()[order]
+        period_data['value'] = np.add.reduceat(values, starts) if len(starts) else values[:0]
+        
+        columns = ['client_key', 'client_id', 'tab_number', 'fio', 'tb', 'gosb', 'client_name', 'value']
+        return pd.DataFrame(period_data, columns=columns)
     
-    def _get_client_aggregation_key(self, row) -> str:
+    def _get_manager_aggregation_keys_from_final(self, clients_base: pd.DataFrame) -> pd.Series:
         """
-        Получение ключа агрегации для клиента в зависимости от режима
+        Векторное получение ключей агрегации менеджеров из итоговых данных
+        в зависимости от режима: final_tab_number, final_tab_number_final_tb
+        или final_tab_number_final_tb_final_gosb
         
         Args:
-            row: Строка данных
+            clients_base (pd.DataFrame): База клиентов
             
         Returns:
-            str: Ключ агрегации
+            pd.Series: Ключи агрегации
         """
-        client_aggregation_mode = self.aggregation_mode
+        keys = self._column_as_text(clients_base['final_tab_number'])
+        if self.aggregation_mode in (2, 3):
+            # Агрегация по final_tab_number + final_tb
+            keys = keys + '_' + self._column_as_text(clients_base['final_tb'])
+        if self.aggregation_mode == 3:
+            # Агрегация по final_tab_number + final_tb + final_gosb
+            keys = keys + '_' + self._column_as_text(clients_base['final_gosb'])
+        return keys
+    
+    def _group_first(self, values: np.ndarray, codes: np.ndarray, group_count: int) -> np.ndarray:
+        """
+        Первое непустое значение в каждой группе (как groupby().agg('first'))
         
-        if client_aggregation_mode == 1:
-            # Агрегация только по client_id
-            return str(row['client_id'])
-        elif client_aggregation_mode == 2:
-            # Агрегация по client_id + tb
-            return f"{row['client_id']}_{row['tb']}"
-        elif client_aggregation_mode == 3:
-            # Агрегация по client_id + tb + gosb
-            return f"{row['client_id']}_{row['tb']}_{row['gosb']}"
-        else:
-            # По умолчанию по client_id
-            return str(row['client_id'])
+        Args:
+            values (np.ndarray): Значения колонки
+            codes (np.ndarray): Коды групп для каждой строки
+            group_count (int): Количество групп
+            
+        Returns:
+            np.ndarray: Значения по группам (NaN для групп без значений)
+        """
+        present = np.flatnonzero(pd.notna(values))
+        groups, first = np.unique(codes[present], return_index=True)
+        result = np.full(group_count, np.nan, dtype=object)
+        result[groups] = values[present[first]]
+        return result
     
-    def _get_manager_aggregation_key(self, row) -> str:
+    def _group_sum(self, codes: np.ndarray, values: np.ndarray, group_count: int) -> np.ndarray:
         """
-        Получение ключа агрегации для менеджера в зависимости от режима
+        Суммы колонок матрицы values по группам
+        Использует ядро numba при наличии модуля, иначе np.bincount по каждой колонке
         
         Args:
-            row: Строка данных
+            codes (np.ndarray): Коды групп для каждой строки
+            values (np.ndarray): Матрица суммируемых значений (float64)
+            group_count (int): Количество групп
             
         Returns:
-            str: Ключ агрегации
-        """
-        manager_aggregation_mode = self.aggregation_mode
-        
-        if manager_aggregation_mode == 1:
-            # Агрегация только по tab_number
-            return str(row['tab_number'])
-        elif manager_aggregation_mode == 2:
-            # Агрегация по tab_number + tb
-            return f"{row['tab_number']}_{row['tb']}"
-        elif manager_aggregation_mode == 3:
-            # Агрегация по tab_number + tb + gosb
-            return f"{row['tab_number']}_{row['tb']}_{row['gosb']}"
-        else:
-            # По умолчанию по tab_number
-            return str(row['tab_number'])
+            np.ndarray: Матрица сумм размером group_count x число колонок
+        """
+        if importlib.util.find_spec('numba') is not None:
+            # Модуль с ядром (и сам numba) загружается только здесь
+            from kernels import group_sum
+            return group_sum(codes, np.ascontiguousarray(values), group_count)
+        return np.column_stack([
+            np.bincount(codes, weights=values[:, column], minlength=group_count)
+            for column in range(values.shape[1])
+        ]) if values.shape[1] else np.zeros((group_count, 0))
     
     def _get_tb_code_from_name(self, tb_name: str) -> int:
         """
@@ -1199,56 +1613,6 @@ class PeriodComparison:
             gosb_padded = str(gosb_code).zfill(6)
             return int(f"8{tb_code:02d}{gosb_padded}")
     
-    def _check_manager_client_match(self, row, period_num: int, client_aggregation_mode: int) -> bool:
-        """
-        Проверка соответствия менеджера и клиента по правилам агрегации
-        
-        Args:
-            row: Строка данных клиента
-            period_num: Номер периода
-            client_aggregation_mode: Режим агрегации клиентов
-            
-        Returns:
-            bool: True если менеджер соответствует клиенту по правилам
-        """
-        if client_aggregation_mode == 1:
-            # Агрегация только по client_id - все менеджеры подходят
-            return True
-        elif client_aggregation_mode == 2:
-            # Агрегация по client_id + tb - проверяем ТБ
-            return row[f'tb_period_{period_num}'] == row['final_tb']
-        elif client_aggregation_mode == 3:
-            # Агрегация по client_id + tb + gosb - проверяем ТБ и ГОСБ
-            return (row[f'tb_period_{period_num}'] == row['final_tb'] and 
-                    row[f'gosb_period_{period_num}'] == row['final_gosb'])
-        else:
-            return True
-    
-    def _get_manager_aggregation_key_from_final(self, row) -> str:
-        """
-        Получение ключа агрегации для менеджера из итоговых данных
-        
-        Args:
-            row: Строка данных
-            
-        Returns:
-            str: Ключ агрегации
-        """
-        manager_aggregation_mode = self.aggregation_mode
-        
-        if manager_aggregation_mode == 1:
-            # Агрегация только по final_tab_number
-            return str(row['final_tab_number'])
-        elif manager_aggregation_mode == 2:
-            # Агрегация по final_tab_number + final_tb
-            return f"{row['final_tab_number']}_{row['final_tb']}"
-        elif manager_aggregation_mode == 3:
-            # Агрегация по final_tab_number + final_tb + final_gosb
-            return f"{row['final_tab_number']}_{row['final_tb']}_{row['final_gosb']}"
-        else:
-            # По умолчанию по final_tab_number
-            return str(row['final_tab_number'])
-    
     def _process_special_zones(self, clients_base: pd.DataFrame) -> None:
         """
         Обработка серой зоны и прочих данных
@@ -1493,7 +1857,6 @@ class PeriodComparison:
     
     def _generate_test_data_only(self) -> None:
         """Режим 1: Просто сгенерировать тест данные"""
-        from test_data_generator import TestDataGenerator
         generator = TestDataGenerator()
         generator.create_test_files()
         logger.info("Тестовые данные сгенерированы успешно")
@@ -1564,27 +1927,28 @@ def check_and_create_test_data():
     logger.info("Создание тестовых данных...")
     
     # Удаление старых тестовых файлов
-    import os
-    from config import ANALYSIS_CONFIG
-    
     # Получаем список файлов, которые используются (use_file=True)
     used_files = [file_config for file_config in ANALYSIS_CONFIG['files'] if file_config.get('use_file', True)]
     
     # Создаем список тестовых файлов на основе обычных файлов с префиксом "test_"
     test_files = []
     for file_config in used_files:
-        import os
         original_path = file_config['path']
         original_filename = os.path.basename(original_path)
         test_filename = f"test_{original_filename}"
         test_files.append(IN_XLSX_DIR / test_filename)
     
+    test_file_names = [str(file_path) for file_path in test_files]
+    
+    # Удаление без предварительной проверки exists(): отсутствующий файл просто пропускается
     deleted_files = []
-    for file_path in test_files:
-        if file_path.exists():
+    for file_path, file_name in zip(test_files, test_file_names):
+        try:
             file_path.unlink()
-            deleted_files.append(str(file_path))
-            logger.debug(f"Удален старый тестовый файл: {file_path}")
+        except FileNotFoundError:
+            continue
+        deleted_files.append(file_name)
+        logger.debug("Удален старый тестовый файл: %s", file_name)
     
     if deleted_files:
         logger.log_test_files_deleted(deleted_files)
@@ -1594,8 +1958,7 @@ def check_and_create_test_data():
     success = create_test_data()
     
     if success:
-        created_files = [str(f) for f in test_files]
-        logger.log_test_files_created(created_files)
+        logger.log_test_files_created(test_file_names)
         logger.info("Тестовые данные созданы успешно")
     else:
         logger.error("Ошибка создания тестовых данных")
@@ -1604,11 +1967,30 @@ def check_and_create_test_data():
     return True
 
 
+def _load_excel_file_worker(*args) -> pd.DataFrame:
+    """
+    Загрузка одного файла в дочернем процессе пула
+    Функция уровня модуля, чтобы ее можно было передать в другой процесс
+    
+    Args:
+        *args: Аргументы PeriodComparison.load_excel_file
+        
+    Returns:
+        pd.DataFrame: Загруженные данные
+    """
+    return PeriodComparison().load_excel_file(*args)
+
+
 def main():
     """
     Главная функция программы
     Запускает анализ периодов
     """
+    logger.startup()
+    
+    # Рабочие каталоги создаются до любых операций с файлами
+    ensure_dirs()
+    
     try:
         # Создание экземпляра класса анализа
         analyzer = PeriodComparison()
@@ -1622,15 +2004,9 @@ def main():
         analyzer.run_analysis()
         
         logger.log_program_end()
-        # Получаем актуальное имя файла из конфигурации
-        base_name = analyzer.output_config['file_name']
-        if analyzer.output_config.get('add_timestamp', False):
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-            output_file = f"{base_name}_{timestamp}.xlsx"
-        else:
-            output_file = f"{base_name}.xlsx"
-        logger.info(f"Анализ завершен успешно. Результаты сохранены в файл {output_file}")
+        # Имя файла то же, что использовалось при записи результата
+        output_file = analyzer.output_config['file_name_resolved']
+        logger.info("Анализ завершен успешно. Результаты сохранены в файл %s", output_file)
         
     except Exception as e:
         logger.log_critical_error(str(e))
@@ -1641,4 +2017,6 @@ def main():
 
 
 if __name__ == "__main__":
-    exit(main())
+    exit_code = main()
+    logger.shutdown()
+    exit(exit_code)
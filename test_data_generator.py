@@ -4,11 +4,11 @@
 Создает Excel файлы с тестовыми данными для проверки работы программы
 """
 
+import os
 import pandas as pd
 import numpy as np
-import random
 from typing import List, Tuple
-from config import TEST_DATA_CONFIG, IN_XLSX_DIR, TB_GOSB_CODES
+from config import ANALYSIS_CONFIG, CLIENT_NAMES_CONFIG, TEST_DATA_CONFIG, IN_XLSX_DIR, TB_GOSB_CODES
 from logger import logger
 
 
@@ -34,6 +34,9 @@ class TestDataGenerator:
         self.managers_change_rate = self.config['managers_change_rate']
         self.value_increase_rate = self.config['value_increase_rate']
         
+        # Генератор случайных чисел (при заданном seed данные воспроизводимы)
+        self.rng = np.random.default_rng(self.config.get('seed'))
+        
         # Получаем реальные коды ТБ и ГОСБ
         self.tb_codes = list(TB_GOSB_CODES['tb_codes'].keys())
         self.gosb_codes = list(TB_GOSB_CODES['gosb_codes'].keys())
@@ -62,17 +65,15 @@ class TestDataGenerator:
         for (tb_code, gosb_code) in self.gosb_codes:
             self.gosb_weights[(tb_code, gosb_code)] = 1
         
-        logger.debug(f"Созданы веса для {len(self.tb_weights)} ТБ и {len(self.gosb_weights)} ГОСБ")
+        logger.debug("Созданы веса для %s ТБ и %s ГОСБ", len(self.tb_weights), len(self.gosb_weights))
     
     def _generate_manager_fio(self) -> str:
         """
         Генерация ФИО менеджера из списков имен, фамилий и отчеств
         """
-        import random
-        
-        first_name = random.choice(self.config['manager_names']['first_names'])
-        last_name = random.choice(self.config['manager_names']['last_names'])
-        middle_name = random.choice(self.config['manager_names']['middle_names'])
+        first_name = str(self.rng.choice(self.config['manager_names']['first_names']))
+        last_name = str(self.rng.choice(self.config['manager_names']['last_names']))
+        middle_name = str(self.rng.choice(self.config['manager_names']['middle_names']))
         
         return f"{last_name} {first_name} {middle_name}"
     
@@ -80,8 +81,6 @@ class TestDataGenerator:
         """
         Генерация читаемого названия клиента
         """
-        from config import CLIENT_NAMES_CONFIG
-        
         # Получаем настройки из конфигурации
         company_names = CLIENT_NAMES_CONFIG['company_names']
         prefixes = CLIENT_NAMES_CONFIG['prefixes']
@@ -129,16 +128,15 @@ class TestDataGenerator:
             })
         
         # Распределяем менеджеров по ГОСБ (5-18 менеджеров в каждом ГОСБ)
-        import random
         manager_id = 1
         
         # Случайно выбираем ГОСБ для распределения менеджеров
         # Убеждаемся, что общее количество менеджеров попадает в диапазон 1500-1600
-        total_managers_needed = random.randint(self.managers_count_min, self.managers_count_max)
+        total_managers_needed = int(self.rng.integers(self.managers_count_min, self.managers_count_max, endpoint=True))
         managers_created = 0
         
         # Перемешиваем ГОСБ для случайного распределения
-        random.shuffle(available_gosb)
+        self.rng.shuffle(available_gosb)
         
         # Сначала заполняем до минимума, затем добавляем до максимума
         for gosb_info in available_gosb:
@@ -155,7 +153,7 @@ class TestDataGenerator:
                 managers_in_gosb = remaining_needed
             else:
                 max_in_gosb = min(self.managers_per_gosb_max, remaining_needed)
-                managers_in_gosb = random.randint(self.managers_per_gosb_min, max_in_gosb)
+                managers_in_gosb = int(self.rng.integers(self.managers_per_gosb_min, max_in_gosb, endpoint=True))
             
             for i in range(managers_in_gosb):
                 # Генерируем ФИО менеджера
@@ -183,10 +181,10 @@ class TestDataGenerator:
         # Проверяем, что все менеджеры имеют табельные номера
         for manager in self.managers:
             if not manager['tab_number'] or manager['tab_number'] == '0' or manager['tab_number'] == '':
-                logger.error(f"Найден менеджер без табельного номера: {manager}")
+                logger.error("Найден менеджер без табельного номера: %s", manager)
                 raise ValueError(f"Менеджер без табельного номера: {manager}")
         
-        logger.debug(f"Сгенерировано {len(self.managers)} менеджеров и {len(self.clients)} клиентов")
+        logger.debug("Сгенерировано %s менеджеров и %s клиентов", len(self.managers), len(self.clients))
     
     def _select_weighted_tb(self) -> int:
         """
@@ -202,7 +200,7 @@ class TestDataGenerator:
         total_weight = sum(weights)
         normalized_weights = [w / total_weight for w in weights]
         
-        return int(np.random.choice(tb_codes, p=normalized_weights))
+        return int(self.rng.choice(tb_codes, p=normalized_weights))
     
     def _select_weighted_gosb(self, tb_code: int) -> int:
         """
@@ -219,7 +217,7 @@ class TestDataGenerator:
         
         if available_gosb:
             # Выбираем случайный ГОСБ из доступных
-            selected_tb, selected_gosb = random.choice(available_gosb)
+            selected_tb, selected_gosb = available_gosb[self.rng.integers(len(available_gosb))]
             return int(selected_gosb)
         else:
             # Если нет ГОСБ для данного ТБ, берем первый доступный ГОСБ
@@ -232,7 +230,7 @@ class TestDataGenerator:
         Returns:
             dict: Словарь с данными менеджера
         """
-        return random.choice(self.managers)
+        return self.managers[self.rng.integers(len(self.managers))]
     
     def _get_random_client(self) -> dict:
         """
@@ -241,7 +239,7 @@ class TestDataGenerator:
         Returns:
             dict: Словарь с данными клиента
         """
-        return random.choice(self.clients)
+        return self.clients[self.rng.integers(len(self.clients))]
     
     def _generate_value(self, base_value: float = None) -> float:
         """
@@ -254,10 +252,10 @@ class TestDataGenerator:
             float: Сгенерированный показатель
         """
         if base_value is None:
-            return random.uniform(*self.value_range)
+            return float(self.rng.uniform(*self.value_range))
         else:
             # Увеличение показателя с некоторой вариацией
-            increase = random.uniform(1.1, self.value_increase_rate)
+            increase = float(self.rng.uniform(*sorted((1.1, self.value_increase_rate))))
             return base_value * increase
     
     def _should_change_manager(self) -> bool:
@@ -267,7 +265,7 @@ class TestDataGenerator:
         Returns:
             bool: True если менеджер должен смениться
         """
-        return random.random() < self.managers_change_rate
+        return self.rng.random() < self.managers_change_rate
     
     def generate_period_data(self, period: int) -> pd.DataFrame:
         """
@@ -279,80 +277,59 @@ class TestDataGenerator:
         Returns:
             pd.DataFrame: Данные периода
         """
-        logger.debug(f"Генерация данных для периода {period}")
-        
-        data = []
-        
-        for i, client in enumerate(self.clients):
-            # Получение менеджера для клиента
-            if period == 1:
-                # В первом периоде случайный менеджер
-                manager = self._get_random_manager()
-            else:
-                # В последующих периодах возможна смена менеджера
-                if self._should_change_manager():
-                    manager = self._get_random_manager()
-                else:
-                    # Используем того же менеджера (упрощение для тестирования)
-                    manager = self._get_random_manager()
-            
-            # Генерация показателя
-            if period == 1:
-                value = self._generate_value()
-            else:
-                # Увеличение показателя в последующих периодах
-                base_value = self._generate_value()
-                value = self._generate_value(base_value)
-            
-            # Добавление некорректных данных для тестирования валидации
-            tab_number = f"'{manager['tab_number']}"
-            client_id = f"'{client['client_id']}"
-            value_to_use = round(value, 2)
-            
-            # Добавляем некорректные значения для тестирования валидации
-            manager_name = manager['fio']
-            if i % 10 == 0:  # Каждый 10-й клиент получает некорректные данные
-                if i % 30 == 0:  # grey_zone
-                    tab_number = "grey_zone"
-                    manager_name = "Серая зона"  # Специальное имя для серой зоны
-                elif i % 30 == 20:  # дефис
-                    tab_number = "-"
-                    manager_name = "-"  # Если табельный номер "-", имя менеджера тоже "-"
-                # Убрали генерацию пустых табельных номеров - каждый менеджер должен иметь табельный номер
-                
-                if i % 20 == 0:  # Некорректные показатели
-                    if i % 40 == 0:  # пустое значение
-                        value_to_use = ""
-                    elif i % 40 == 20:  # дефис
-                        value_to_use = "-"
-            
-            # Определяем ТБ и ГОСБ в зависимости от наличия менеджера
-            if tab_number == "-":
-                # Если табельный номер "-", ТБ и ГОСБ тоже "-"
-                tb_value = "-"
-                gosb_value = "-"
-            else:
-                # Используем ТБ и ГОСБ менеджера
-                tb_value = manager['tb']
-                gosb_value = manager['gosb']
-            
-            # Создание записи
-            record = {
-                'Таб. номер': tab_number,
-                'КМ': manager_name,
-                'ТБ': tb_value,
-                'ГОСБ': gosb_value,
-                'ИНН': client_id,
-                'Клиент': client['client_name'],
-                'ФОТ': value_to_use
-            }
-            
-            data.append(record)
+        logger.debug("Генерация данных для периода %s", period)
+        
+        clients_count = len(self.clients)
+        index = np.arange(clients_count)
+        
+        # Менеджер для каждого клиента выбирается одним векторным вызовом
+        # (в последующих периодах менеджер также выбирается случайно)
+        managers = pd.DataFrame(self.managers)
+        manager_idx = self.rng.integers(0, len(managers), size=clients_count)
+        tab_numbers = ("'" + managers['tab_number'].to_numpy(dtype=object)[manager_idx]).astype(object)
+        manager_names = managers['fio'].to_numpy(dtype=object)[manager_idx]
+        tb_values = managers['tb'].to_numpy(dtype=object)[manager_idx]
+        gosb_values = managers['gosb'].to_numpy(dtype=object)[manager_idx]
+        
+        # Генерация показателей
+        values = self.rng.uniform(*self.value_range, size=clients_count)
+        if period > 1:
+            # Изменение показателя в последующих периодах
+            increase_bounds = sorted((1.1, self.value_increase_rate))
+            values = values * self.rng.uniform(*increase_bounds, size=clients_count)
+        values = np.round(values, 2).astype(object)
+        
+        # Добавляем некорректные значения для тестирования валидации
+        # (каждый 10-й клиент получает некорректные данные)
+        grey_zone_mask = index % 30 == 0
+        tab_numbers[grey_zone_mask] = "grey_zone"
+        manager_names[grey_zone_mask] = "Серая зона"  # Специальное имя для серой зоны
+        
+        # Если табельный номер "-", имя менеджера, ТБ и ГОСБ тоже "-"
+        dash_mask = index % 30 == 20
+        tab_numbers[dash_mask] = "-"
+        manager_names[dash_mask] = "-"
+        tb_values[dash_mask] = "-"
+        gosb_values[dash_mask] = "-"
+        
+        # Некорректные показатели: пустое значение и дефис
+        values[index % 40 == 0] = ""
+        values[index % 40 == 20] = "-"
+        
+        clients = pd.DataFrame(self.clients)
         
         # Создание DataFrame
-        df = pd.DataFrame(data)
-        
-        logger.debug(f"Сгенерировано {len(df)} записей для периода {period}")
+        df = pd.DataFrame({
+            'Таб. номер': tab_numbers,
+            'КМ': manager_names,
+            'ТБ': tb_values,
+            'ГОСБ': gosb_values,
+            'ИНН': "'" + clients['client_id'],
+            'Клиент': clients['client_name'],
+            'ФОТ': values
+        })
+        
+        logger.debug("Сгенерировано %s записей для периода %s", len(df), period)
         return df
     
     def create_test_files(self) -> bool:
@@ -365,7 +342,6 @@ class TestDataGenerator:
         try:
             # Создание файлов для каждого периода
             # Количество периодов зависит от файлов с use_file=True
-            from config import ANALYSIS_CONFIG
             used_files = [file_config for file_config in ANALYSIS_CONFIG['files'] if file_config.get('use_file', True)]
             periods_count = len(used_files)
             
@@ -377,7 +353,6 @@ class TestDataGenerator:
                 # Генерируем имя на основе обычных файлов с префиксом "test_"
                 if period <= len(used_files):
                     # Берем имя файла из конфигурации и добавляем префикс "test_"
-                    import os
                     original_path = used_files[period - 1]['path']
                     original_filename = os.path.basename(original_path)
                     test_filename = f"test_{original_filename}"
@@ -390,13 +365,12 @@ class TestDataGenerator:
                 with pd.ExcelWriter(filename, engine='openpyxl') as writer:
                     df.to_excel(writer, sheet_name='Sheet1', index=False)
                 
-                logger.debug(f"Создан тестовый файл: {filename}")
+                logger.debug("Создан тестовый файл: %s", filename)
             
             logger.info("Тестовые данные созданы")
             print("Тестовые файлы созданы успешно:")
             for period in range(1, periods_count + 1):
                 if period <= len(used_files):
-                    import os
                     original_path = used_files[period - 1]['path']
                     original_filename = os.path.basename(original_path)
                     test_filename = f"test_{original_filename}"
@@ -431,9 +405,6 @@ def create_test_data():
 
 
 if __name__ == "__main__":
-    # Импорт логгера для использования в main
-    from logger import logger
-    
     # Создание тестовых данных
     success = create_test_data()
     if success: